@@ -0,0 +1,113 @@
+import time
+
+from django.conf import settings
+from django.utils.crypto import get_random_string
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed, InvalidToken)
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.models import User
+
+USER_CLAIMS = ('username', 'role', 'is_superuser')
+STATE_FIELDS = USER_CLAIMS + ('is_active',)
+CONFIRMATION_CODE_LENGTH = 32
+
+
+def new_confirmation_code():
+    """Случайный код подтверждения для получения токена"""
+    return get_random_string(CONFIRMATION_CODE_LENGTH)
+
+
+def get_access_token(user):
+    """Выпустить токен с данными пользователя, нужными для проверки прав"""
+    token = AccessToken.for_user(user)
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+class UserStateCache:
+    """Короткоживущий кэш состояния пользователей в памяти процесса
+
+    Нужен, чтобы замечать удалённых, заблокированных и сменивших роль
+    пользователей, не читая строку User на каждый запрос.
+    """
+    max_size = 10000
+
+    def __init__(self):
+        self.states = {}
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'TOKEN_USER_CACHE_TTL', 60)
+
+    def get(self, user_id):
+        now = time.monotonic()
+        cached = self.states.get(user_id)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        if len(self.states) >= self.max_size:
+            self.states.clear()
+        state = User.objects.filter(pk=user_id).values(*STATE_FIELDS).first()
+        self.states[user_id] = (now + self.ttl, state)
+        return state
+
+    def invalidate(self, user_id):
+        self.states.pop(user_id, None)
+
+    def clear(self):
+        self.states.clear()
+
+
+user_states = UserStateCache()
+
+
+class RoleTokenUser(TokenUser):
+    """Пользователь, собранный из токена без запроса к БД"""
+
+    def __init__(self, token, state):
+        super().__init__(token)
+        self.state = state
+
+    @cached_property
+    def username(self):
+        return self.token.get('username', self.state['username'])
+
+    @cached_property
+    def role(self):
+        return self.token.get('role', self.state['role'])
+
+    @cached_property
+    def is_superuser(self):
+        return self.token.get('is_superuser', self.state['is_superuser'])
+
+
+class TokenUserAuthentication(JWTAuthentication):
+    """JWT-аутентификация без чтения пользователя из БД на каждый запрос
+
+    Токены без утверждений о пользователе (выпущенные до их появления)
+    принимаются, недостающие данные берутся из кэша состояния.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(
+                'Token contained no recognizable user identification')
+        state = user_states.get(validated_token[api_settings.USER_ID_CLAIM])
+        if state is None:
+            raise AuthenticationFailed(
+                'User not found', code='user_not_found')
+        if not state['is_active']:
+            raise AuthenticationFailed(
+                'User is inactive', code='user_inactive')
+        user = RoleTokenUser(validated_token, state)
+        if (user.role, user.is_superuser) != (
+                state['role'], state['is_superuser']):
+            raise AuthenticationFailed(
+                'Права пользователя изменились, получите новый токен',
+                code='token_revoked')
+        return user
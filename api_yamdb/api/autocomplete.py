@@ -0,0 +1,65 @@
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db.models import Count
+
+from reviews.models import Category, Genre
+
+
+class PrefixIndex:
+    """Индекс названий и слагов в памяти процесса для поиска по префиксу
+
+    Ключи (слаг, название и каждое слово названия в нижнем регистре)
+    хранятся в отсортированном списке, поиск идёт двоичным поиском.
+    Индекс перестраивается при первом запросе после invalidate() или
+    по истечении AUTOCOMPLETE_MAX_AGE секунд.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.state = None
+
+    def invalidate(self):
+        self.state = None
+
+    def build(self):
+        items = list(
+            self.model.objects.annotate(titles_count=Count('title'))
+            .order_by('-titles_count', 'name')
+            .values_list('name', 'slug')
+        )
+        keys = sorted({
+            (key, position)
+            for position, (name, slug) in enumerate(items)
+            for key in {slug.lower(), name.lower(), *name.lower().split()}
+        })
+        return time.monotonic(), keys, items
+
+    def get_state(self):
+        state = self.state
+        max_age = getattr(settings, 'AUTOCOMPLETE_MAX_AGE', 60)
+        if state is None or time.monotonic() - state[0] > max_age:
+            state = self.state = self.build()
+        return state
+
+    def search(self, prefix, limit):
+        """Элементы, у которых слаг или слово названия начинается с prefix
+
+        Результат упорядочен по числу произведений, затем по названию.
+        """
+        _, keys, items = self.get_state()
+        prefix = prefix.lower()
+        positions = set()
+        for key, position in keys[bisect_left(keys, (prefix,)):]:
+            if not key.startswith(prefix):
+                break
+            positions.add(position)
+        return [
+            {'name': items[position][0], 'slug': items[position][1]}
+            for position in sorted(positions)[:limit]
+        ]
+
+
+genre_index = PrefixIndex(Genre)
+category_index = PrefixIndex(Category)
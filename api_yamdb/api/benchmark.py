@@ -0,0 +1,383 @@
+"""Замеры числа запросов к БД, задержки и памяти для маршрутов API"""
+import json
+import math
+import time
+import tracemalloc
+from collections import namedtuple
+from io import StringIO
+from itertools import count
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from reviews.models import (Category, Comment, Genre, Review, Title, User,
+                            UserRole)
+
+from .authentication import get_access_token
+
+# prepare(i) готовит i-й запрос вне замера и возвращает (path, data)
+Case = namedtuple('Case', ['name', 'route', 'method', 'prepare', 'token'])
+
+# Допуск сверх относительного: мелкие значения сильно шумят
+METRIC_SLACK = {'p50_ms': 1.0, 'p95_ms': 2.0, 'alloc_kb': 16.0}
+
+
+def api_routes():
+    """Имена всех маршрутов api/urls.py, кроме корня роутера"""
+    from .urls import router, urlpatterns
+
+    names = {getattr(pattern, 'name', None) for pattern in urlpatterns}
+    names.update(pattern.name for pattern in router.urls)
+    names -= {None, 'api-root'}
+    return names
+
+
+def populate(size):
+    """Заполнить пустую БД данными generate_dataset на size произведений"""
+    call_command(
+        'generate_dataset', users=size // 2 + 10, titles=size,
+        reviews=size * 10, comments=size * 10, genres=size // 10 + 3,
+        stdout=StringIO())
+
+
+class Benchmark:
+    """Набор сценариев по всем маршрутам API на заполненной БД"""
+
+    def __init__(self, repeat=20):
+        self.repeat = repeat
+        self.client = Client()
+        self.serial = count()
+        self.admin = User.objects.create(
+            username='bench-admin', email='bench-admin@example.com',
+            role=UserRole.ADMIN.value, confirmation_code='bench-code')
+        self.token = get_access_token(self.admin)
+        self.title = Title.objects.order_by('-rating_count', 'id').first()
+        self.review = self.title.reviews.annotate(
+            comments_count=Count('comments')
+        ).order_by('-comments_count', 'id').first()
+        self.comment = self.review.comments.order_by('id').first()
+        self.category = self.title.category
+        self.genre = self.title.genre.first()
+
+    def url(self, route, **kwargs):
+        return reverse(f'api:{route}', kwargs=kwargs)
+
+    def unique(self, prefix):
+        return f'{prefix}{next(self.serial)}'
+
+    def new_title(self):
+        title = Title.objects.create(
+            name=self.unique('Замер '), year=2000,
+            category=self.category)
+        title.genre.add(self.genre)
+        return title
+
+    def new_review(self):
+        name = self.unique('bench-author-')
+        author = User.objects.create(
+            username=name, email=f'{name}@example.com')
+        return Review.objects.create(
+            title=self.title, author=author, text='Отзыв', score=5)
+
+    def title_kwargs(self):
+        return {'title_id': self.title.id}
+
+    def review_kwargs(self):
+        return {'title_id': self.title.id, 'review_id': self.review.id}
+
+    def get_cases(self):
+        return (
+            self.user_cases() + self.dictionary_cases('categories')
+            + self.dictionary_cases('genres') + self.title_cases()
+            + self.review_cases() + self.comment_cases()
+            + self.search_cases() + self.auth_cases()
+        )
+
+    def case(self, name, route, method, prepare, token=True):
+        return Case(name, route, method, prepare, token)
+
+    def user_cases(self):
+        def new_user():
+            name = self.unique('bench-user-')
+            return {'username': name, 'email': f'{name}@example.com'}
+
+        def existing(i):
+            user = User.objects.create(**new_user())
+            return self.url('user-detail', username=user.username)
+
+        return [
+            self.case('users list', 'user-list', 'get',
+                      lambda i: (self.url('user-list'), {})),
+            self.case('users create', 'user-list', 'post',
+                      lambda i: (self.url('user-list'), new_user())),
+            self.case('users bulk', 'user-bulk', 'post',
+                      lambda i: (self.url('user-bulk'),
+                                 [new_user() for _ in range(100)])),
+            self.case('users detail', 'user-detail', 'get',
+                      lambda i: (existing(i), {})),
+            self.case('users update', 'user-detail', 'patch',
+                      lambda i: (existing(i), {'bio': 'Замер'})),
+            self.case('users delete', 'user-detail', 'delete',
+                      lambda i: (existing(i), {})),
+            self.case('users me', 'user-me', 'get',
+                      lambda i: (self.url('user-me'), {})),
+            self.case('users me update', 'user-me', 'patch',
+                      lambda i: (self.url('user-me'), {'bio': str(i)})),
+        ]
+
+    def dictionary_cases(self, route):
+        model = Category if route == 'categories' else Genre
+
+        def new_item():
+            slug = self.unique(f'bench-{route}-')
+            return {'name': slug, 'slug': slug}
+
+        def existing(i):
+            item = model.objects.create(**new_item())
+            return self.url(f'{route}-detail', slug=item.slug)
+
+        return [
+            self.case(f'{route} list', f'{route}-list', 'get',
+                      lambda i: (self.url(f'{route}-list'), {})),
+            self.case(f'{route} search', f'{route}-list', 'get',
+                      lambda i: (self.url(f'{route}-list'),
+                                 {'search': '1'})),
+            self.case(f'{route} create', f'{route}-list', 'post',
+                      lambda i: (self.url(f'{route}-list'), new_item())),
+            self.case(f'{route} delete', f'{route}-detail', 'delete',
+                      lambda i: (existing(i), {})),
+            self.case(f'{route} autocomplete', f'{route}-autocomplete',
+                      'get', lambda i: (self.url(f'{route}-autocomplete'),
+                                        {'q': 'ж'})),
+        ]
+
+    def title_cases(self):
+        filters = {
+            'category': {'category': self.category.slug},
+            'genre': {'genre': self.genre.slug},
+            'name': {'name': 'произведение 1'},
+            'year': {'year': self.title.year},
+            'search': {'search': 'описание'},
+        }
+        cases = [
+            self.case('titles list', 'titles-list', 'get',
+                      lambda i: (self.url('titles-list'), {})),
+            self.case('titles list anonymous', 'titles-list', 'get',
+                      lambda i: (self.url('titles-list'), {}), token=False),
+        ]
+        cases += [
+            self.case(f'titles list by {name}', 'titles-list', 'get',
+                      lambda i, params=params: (self.url('titles-list'),
+                                                params))
+            for name, params in filters.items()
+        ]
+        return cases + [
+            self.case('titles create', 'titles-list', 'post',
+                      lambda i: (self.url('titles-list'), {
+                          'name': self.unique('Новое '), 'year': 2000,
+                          'category': self.category.slug,
+                          'genre': [self.genre.slug]})),
+            self.case('titles detail', 'titles-detail', 'get',
+                      lambda i: (self.url('titles-detail',
+                                          pk=self.title.id), {})),
+            self.case('titles update', 'titles-detail', 'patch',
+                      lambda i: (self.url('titles-detail',
+                                          pk=self.new_title().id),
+                                 {'description': 'Замер'})),
+            self.case('titles delete', 'titles-detail', 'delete',
+                      lambda i: (self.url('titles-detail',
+                                          pk=self.new_title().id), {})),
+        ]
+
+    def review_cases(self):
+        def detail(review):
+            return self.url('reviews-detail', title_id=review.title_id,
+                            pk=review.id)
+
+        return [
+            self.case('reviews list', 'reviews-list', 'get',
+                      lambda i: (self.url('reviews-list',
+                                          **self.title_kwargs()), {})),
+            self.case('reviews list cursor', 'reviews-list', 'get',
+                      lambda i: (self.url('reviews-list',
+                                          **self.title_kwargs()),
+                                 {'pagination': 'cursor'})),
+            self.case('reviews create', 'reviews-list', 'post',
+                      lambda i: (self.url('reviews-list',
+                                          title_id=self.new_title().id),
+                                 {'text': 'Отзыв', 'score': 7})),
+            self.case('reviews detail', 'reviews-detail', 'get',
+                      lambda i: (detail(self.review), {})),
+            self.case('reviews update', 'reviews-detail', 'patch',
+                      lambda i: (detail(self.new_review()), {'score': 3})),
+            self.case('reviews delete', 'reviews-detail', 'delete',
+                      lambda i: (detail(self.new_review()), {})),
+        ]
+
+    def comment_cases(self):
+        def detail(comment):
+            return self.url('comments-detail', pk=comment.id,
+                            **self.review_kwargs())
+
+        def new_comment():
+            return Comment.objects.create(
+                review=self.review, author=self.admin, text='Комментарий')
+
+        return [
+            self.case('comments list', 'comments-list', 'get',
+                      lambda i: (self.url('comments-list',
+                                          **self.review_kwargs()), {})),
+            self.case('comments create', 'comments-list', 'post',
+                      lambda i: (self.url('comments-list',
+                                          **self.review_kwargs()),
+                                 {'text': 'Комментарий'})),
+            self.case('comments detail', 'comments-detail', 'get',
+                      lambda i: (detail(self.comment), {})),
+            self.case('comments update', 'comments-detail', 'patch',
+                      lambda i: (detail(new_comment()), {'text': 'Новый'})),
+            self.case('comments delete', 'comments-detail', 'delete',
+                      lambda i: (detail(new_comment()), {})),
+        ]
+
+    def search_cases(self):
+        return [
+            self.case('search reviews', 'search-reviews-list', 'get',
+                      lambda i: (self.url('search-reviews-list'),
+                                 {'q': 'отзыв'}), token=False),
+            self.case('search comments', 'search-comments-list', 'get',
+                      lambda i: (self.url('search-comments-list'),
+                                 {'q': 'комментарий'}), token=False),
+        ]
+
+    def auth_cases(self):
+        def signup(i):
+            name = self.unique('bench-signup-')
+            return self.url('get_code'), {
+                'username': name, 'email': f'{name}@example.com'}
+
+        return [
+            self.case('auth signup', 'get_code', 'post', signup,
+                      token=False),
+            self.case('auth token', 'get_token', 'post',
+                      lambda i: (self.url('get_token'), {
+                          'username': self.admin.username,
+                          'confirmation_code': 'bench-code'}),
+                      token=False),
+        ]
+
+    def send(self, case, path, data):
+        headers = {}
+        if case.token:
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {self.token}'
+        if case.method == 'get':
+            response = self.client.get(path, data, **headers)
+        else:
+            response = self.client.generic(
+                case.method.upper(), path, json.dumps(data),
+                content_type='application/json', **headers)
+        if response.status_code >= 400:
+            raise AssertionError(
+                f'{case.name}: {case.method.upper()} {path} вернул '
+                f'{response.status_code}: {response.content[:200]!r}')
+        return response
+
+    def measure(self, case):
+        """Прогреть сценарий и снять запросы, задержки и память"""
+        self.send(case, *case.prepare(0))
+        timings = []
+        queries = 0
+        for i in range(1, self.repeat + 1):
+            request = case.prepare(i)
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                self.send(case, *request)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = max(queries, len(captured))
+        request = case.prepare(self.repeat + 1)
+        tracemalloc.start()
+        try:
+            self.send(case, *request)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {
+            'queries': queries,
+            'p50_ms': round(percentile(timings, 0.5), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'alloc_kb': round(peak / 1024, 1),
+        }
+
+    def run(self, only=None):
+        cases = self.get_cases()
+        missing = api_routes() - {case.route for case in cases}
+        if missing:
+            raise AssertionError(
+                f'Нет сценариев для маршрутов: {", ".join(sorted(missing))}')
+        return {
+            case.name: self.measure(case) for case in cases
+            if only is None or only in case.name
+        }
+
+
+def compare_renderers(page_sizes=(5, 100, 1000), repeat=20):
+    """Время отрисовки страниц TitleSerializer стандартным и быстрым JSON
+
+    Возвращает {размер страницы: (мс JSONRenderer, мс FastJSONRenderer)}
+    и проверяет, что оба рендерера дают одинаковые байты.
+    """
+    from rest_framework.renderers import JSONRenderer
+
+    from .renderers import FastJSONRenderer
+    from .serializers import TitleSerializer
+
+    queryset = Title.objects.select_related('category').prefetch_related(
+        'genre').order_by('-id')
+    results = {}
+    for size in page_sizes:
+        data = TitleSerializer(queryset[:size], many=True).data
+        timings = []
+        for renderer in (JSONRenderer(), FastJSONRenderer()):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                rendered = renderer.render(data)
+            timings.append((time.perf_counter() - started) / repeat * 1000)
+            if len(timings) == 1:
+                expected = rendered
+            elif rendered != expected:
+                raise AssertionError(
+                    f'FastJSONRenderer отличается на странице из {size}')
+        results[len(data)] = tuple(timings)
+    return results
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(share * len(ordered)) - 1)]
+
+
+def compare(results, baseline, tolerance):
+    """Список регрессий относительно сохранённых замеров
+
+    Число запросов не должно расти вовсе, остальные метрики могут
+    превышать базовые на долю tolerance и на METRIC_SLACK.
+    """
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if metrics['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: запросов {metrics["queries"]}, '
+                f'было {base["queries"]}')
+        for metric, slack in METRIC_SLACK.items():
+            limit = base[metric] * (1 + tolerance) + slack
+            if metrics[metric] > limit:
+                regressions.append(
+                    f'{name}: {metric} {metrics[metric]}, '
+                    f'было {base[metric]}')
+    return regressions
@@ -0,0 +1,56 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+
+from reviews.models import DataVersion
+
+
+def get_cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+def get_versions(scopes):
+    """Текущие версии областей данных одним запросом
+
+    Версии хранятся в БД, а не в кэше процесса, поэтому запись в одном
+    процессе сразу меняет ETag и ключи кэша ответов во всех остальных.
+    """
+    stored = dict(DataVersion.objects.filter(
+        scope__in=scopes).values_list('scope', 'version'))
+    return [str(stored.get(scope, 0)) for scope in scopes]
+
+
+def bump_versions(*scopes):
+    """Сделать недействительными все ответы, зависящие от scopes
+
+    Вызывается в транзакции записи: новая версия становится видна
+    вместе с изменёнными данными.
+    """
+    scopes = sorted(set(scopes))
+    DataVersion.objects.bulk_create(
+        [DataVersion(scope=scope) for scope in scopes],
+        ignore_conflicts=True)
+    DataVersion.objects.filter(scope__in=scopes).update(
+        version=F('version') + 1)
+
+
+def normalized_query(request):
+    """Строка запроса с отсортированными параметрами"""
+    return urlencode(sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    ))
+
+
+def response_cache_key(request, versions):
+    # ссылки пагинации в ответе абсолютные, поэтому схема и хост
+    # входят в ключ
+    url = (f'{request.scheme}://{request.get_host()}{request.path}'
+           f'?{normalized_query(request)}')
+    digest = hashlib.md5(
+        ':'.join([url, *versions]).encode()).hexdigest()
+    return f'api:response:{digest}'
@@ -1,6 +1,7 @@
 import django_filters
 
 from reviews.models import Title
+from reviews.search import get_search_backend
 
 
 class TitleFilter(django_filters.FilterSet):
@@ -9,7 +10,11 @@ class TitleFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(
         field_name='name', lookup_expr='icontains')
     year = django_filters.NumberFilter(field_name='year')
+    search = django_filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Title
-        fields = ('category', 'genre', 'year', 'name')
+        fields = ('category', 'genre', 'year', 'name', 'search')
+
+    def filter_search(self, queryset, name, value):
+        return get_search_backend().search(queryset, value)
@@ -0,0 +1,101 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+
+from api.benchmark import Benchmark, compare, compare_renderers, populate
+
+BASELINE_PATH = os.path.join(settings.BASE_DIR, 'benchmark_baseline.json')
+
+
+class Command(BaseCommand):
+    help = ('Замеряет запросы к БД, задержку и память для всех маршрутов '
+            'API на тестовой БД и сравнивает с сохранёнными замерами')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', type=int, default=200,
+            help='Сколько произведений сгенерировать'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Сколько раз выполнить каждый запрос'
+        )
+        parser.add_argument(
+            '--only', help='Замерять только сценарии с этой подстрокой'
+        )
+        parser.add_argument(
+            '--baseline', default=BASELINE_PATH,
+            help='Файл с замерами, с которыми идёт сравнение'
+        )
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Записать результаты в файл замеров вместо сравнения'
+        )
+        parser.add_argument(
+            '--renderers', action='store_true',
+            help='Сравнить скорость JSON-рендереров вместо замеров маршрутов'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Допустимый относительный рост задержки и памяти'
+        )
+
+    def handle(self, *args, **options):
+        if not (options['renderers'] or options['save_baseline']
+                or os.path.exists(options['baseline'])):
+            raise CommandError(
+                f'Файл замеров {options["baseline"]} не найден. '
+                'Сохраните замеры командой с --save-baseline')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True)
+        try:
+            populate(options['size'])
+            if options['renderers']:
+                return self.report_renderers(
+                    compare_renderers(repeat=options['repeat']))
+            results = Benchmark(options['repeat']).run(options['only'])
+        except AssertionError as error:
+            raise CommandError(error)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        self.report(results)
+
+        if options['save_baseline']:
+            with open(options['baseline'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2,
+                          sort_keys=True)
+            self.stdout.write(f'Замеры сохранены в {options["baseline"]}')
+            return
+        with open(options['baseline'], encoding='utf-8') as file:
+            regressions = compare(
+                results, json.load(file), options['tolerance'])
+        if regressions:
+            raise CommandError(
+                'Регрессии производительности:\n' + '\n'.join(regressions))
+        self.stdout.write('Регрессий нет')
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"сценарий":<28} {"запросы":>7} {"p50, мс":>8} '
+            f'{"p95, мс":>8} {"память, КБ":>10}')
+        for name, metrics in results.items():
+            self.stdout.write(
+                f'{name:<28} {metrics["queries"]:>7} '
+                f'{metrics["p50_ms"]:>8.2f} {metrics["p95_ms"]:>8.2f} '
+                f'{metrics["alloc_kb"]:>10.1f}')
+
+    def report_renderers(self, results):
+        self.stdout.write(
+            f'{"произведений":>12} {"json, мс":>9} {"orjson, мс":>10} '
+            f'{"ускорение":>9}')
+        for size, (standard, fast) in results.items():
+            self.stdout.write(
+                f'{size:>12} {standard:>9.3f} {fast:>10.3f} '
+                f'{standard / fast:>8.1f}x')
@@ -0,0 +1,191 @@
+"""Метрики API в текстовом формате Prometheus"""
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+
+from reviews.outbox import pending_emails
+
+# Верхние границы корзин гистограммы задержки, в секундах
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsStore:
+    """Счётчики запросов одного процесса
+
+    Если задан METRICS_DIR, процесс не реже раза в METRICS_FLUSH_INTERVAL
+    секунд записывает свои счётчики в отдельный файл, а /metrics
+    складывает файлы всех процессов.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = Counter()
+        self.queries = Counter()
+        # обращения к кэшу ответов: hits и misses
+        self.cache_lookups = Counter()
+        # route -> число попаданий в каждую корзину, в +Inf и сумма секунд
+        self.durations = {}
+        self.flushed = 0.0
+
+    def observe(self, route, method, status, seconds, queries):
+        with self.lock:
+            self.requests[f'{route} {method} {status}'] += 1
+            self.queries[route] += queries
+            histogram = self.durations.setdefault(
+                route, [0] * (len(BUCKETS) + 1) + [0.0])
+            histogram[bisect_left(BUCKETS, seconds)] += 1
+            histogram[-1] += seconds
+        directory = settings.METRICS_DIR
+        interval = settings.METRICS_FLUSH_INTERVAL
+        if directory and time.monotonic() - self.flushed >= interval:
+            self.flush(directory)
+
+    def observe_cache(self, result):
+        with self.lock:
+            self.cache_lookups[result] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'requests': dict(self.requests),
+                'queries': dict(self.queries),
+                'cache': dict(self.cache_lookups),
+                'durations': {route: list(histogram) for route, histogram
+                              in self.durations.items()},
+            }
+
+    def flush(self, directory):
+        """Атомарно заменить файл процесса текущими счётчиками"""
+        self.flushed = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+                'w', dir=directory, suffix='.tmp', delete=False) as file:
+            json.dump(self.snapshot(), file)
+        os.replace(file.name, os.path.join(directory, f'{os.getpid()}.json'))
+
+    def collect(self):
+        """Счётчики всех процессов"""
+        directory = settings.METRICS_DIR
+        if not directory:
+            return self.snapshot()
+        self.flush(directory)
+        total = {'requests': Counter(), 'queries': Counter(),
+                 'cache': Counter(), 'durations': {}}
+        for name in os.listdir(directory):
+            if not name.endswith('.json'):
+                continue
+            with open(os.path.join(directory, name)) as file:
+                snapshot = json.load(file)
+            total['requests'].update(snapshot['requests'])
+            total['queries'].update(snapshot['queries'])
+            total['cache'].update(snapshot.get('cache', {}))
+            for route, histogram in snapshot['durations'].items():
+                summed = total['durations'].setdefault(
+                    route, [0] * len(histogram))
+                total['durations'][route] = [
+                    a + b for a, b in zip(summed, histogram)]
+        return total
+
+
+metrics_store = MetricsStore()
+
+
+class MetricsMiddleware:
+    """Считает запросы, задержку и обращения к БД по именам маршрутов"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        route = match.url_name if match else 'unresolved'
+        if route != 'metrics':
+            metrics_store.observe(route, request.method,
+                                  response.status_code, elapsed,
+                                  queries.count)
+        return response
+
+
+def metric(name, kind, description, samples):
+    lines = [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+    for suffix, labels, value in samples:
+        label_text = ','.join(
+            f'{key}="{label}"' for key, label in labels.items())
+        lines.append(f'{name}{suffix}{{{label_text}}} {value}'
+                     if label_text else f'{name}{suffix} {value}')
+    return lines
+
+
+def histogram_samples(durations):
+    for route, histogram in sorted(durations.items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), histogram):
+            cumulative += count
+            yield '_bucket', {'route': route, 'le': bound}, cumulative
+        yield '_sum', {'route': route}, histogram[-1]
+        yield '_count', {'route': route}, cumulative
+
+
+def render_metrics():
+    collected = metrics_store.collect()
+    hits = collected['cache'].get('hits', 0)
+    misses = collected['cache'].get('misses', 0)
+    requests = sorted(
+        (key.split(' '), count)
+        for key, count in collected['requests'].items())
+    lines = metric(
+        'api_requests_total', 'counter', 'Число запросов по маршрутам', (
+            ('', {'route': route, 'method': method, 'status': status},
+             count)
+            for (route, method, status), count in requests))
+    lines += metric(
+        'api_request_duration_seconds', 'histogram',
+        'Время обработки запроса', histogram_samples(
+            collected['durations']))
+    lines += metric(
+        'api_db_queries_total', 'counter', 'Число запросов к БД', (
+            ('', {'route': route}, count)
+            for route, count in sorted(collected['queries'].items())))
+    lines += metric(
+        'api_response_cache_requests_total', 'counter',
+        'Обращения к кэшу ответов', (
+            ('', {'result': 'hit'}, hits),
+            ('', {'result': 'miss'}, misses)))
+    lines += metric(
+        'api_response_cache_hit_ratio', 'gauge',
+        'Доля попаданий в кэш ответов',
+        [('', {}, hits / (hits + misses) if hits + misses else 0)])
+    lines += metric(
+        'api_email_outbox_pending', 'gauge', 'Писем в очереди на отправку',
+        [('', {}, pending_emails().count())])
+    return '\n'.join(lines) + '\n'
+
+
+def metrics(request):
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)
@@ -1,9 +1,192 @@
-from rest_framework import filters, mixins, viewsets
+import hashlib
 
+from django.conf import settings
+from django.utils.http import parse_etags
+from rest_framework import filters, mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+
+from .cache import (get_cache, get_versions, normalized_query,
+                    response_cache_key)
+from .metrics import metrics_store
 from .permissions import IsAdmin, IsAnon
+from .profiling import serializing
+
+
+class DataScopesMixin:
+    """Области данных, от которых зависит ответ, и их версии
+
+    Версии меняются в api.signals и читаются из БД не больше одного
+    раза за запрос, даже если их используют и кэш, и ETag.
+    """
+    cache_scopes = ()
+    _scope_versions = None
+
+    def get_cache_scopes(self):
+        return self.cache_scopes
+
+    def get_scope_versions(self):
+        if self._scope_versions is None:
+            self._scope_versions = get_versions(self.get_cache_scopes())
+        return self._scope_versions
+
+
+class AnonymousCacheMixin(DataScopesMixin):
+    """Кэширование списков для анонимных пользователей
+
+    Ответ зависит только от адреса и параметров запроса, а также от
+    версий областей данных get_cache_scopes(). Версии хранятся в БД,
+    поэтому кэш в памяти каждого процесса перестаёт отдавать ответ
+    сразу после записи в любом процессе.
+    """
+
+    def list(self, request, *args, **kwargs):
+        scopes = self.get_cache_scopes()
+        if request.user.is_authenticated or not scopes:
+            return super().list(request, *args, **kwargs)
+        cache = get_cache()
+        key = response_cache_key(request, self.get_scope_versions())
+        data = cache.get(key)
+        if data is not None:
+            metrics_store.observe_cache('hits')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        metrics_store.observe_cache('misses')
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data,
+                      getattr(settings, 'API_RESPONSE_CACHE_TIMEOUT', 300))
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class ConditionalGetMixin(DataScopesMixin):
+    """ETag и ответ 304 Not Modified для list и retrieve
+
+    ETag строится по версиям областей данных get_cache_scopes() из БД,
+    поэтому неизменившийся ответ отдаётся после одного запроса версий,
+    без выборки данных и сериализации.
+    """
+
+    def get_etag(self, request):
+        url = f'{request.path}?{normalized_query(request)}'
+        versions = self.get_scope_versions()
+        digest = hashlib.md5(':'.join(
+            [url, request.accepted_renderer.format, *versions]).encode())
+        return f'"{digest.hexdigest()}"'
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in [tag.replace('W/', '', 1) for tag in if_none_match]:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK,
+                                    status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
 
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
 
-class CreateListDestroyMixinSet(mixins.CreateModelMixin,
+
+class NestedResourceMixin:
+    """Вложенные маршруты вида /titles/<title_id>/reviews/
+
+    Родитель из URL загружается не больше одного раза за запрос.
+    Дочерние объекты фильтруются по параметрам URL без загрузки
+    родителя, так что вложенность проверяется тем же запросом;
+    родитель нужен только при создании и для ответа 404, когда
+    страница списка пуста.
+    parent_lookups и child_lookups сопоставляют поля моделей с
+    параметрами URL.
+    """
+    parent_model = None
+    parent_lookups = {}
+    child_lookups = {}
+    _parent = None
+
+    def get_lookup_values(self, lookups):
+        return {field: self.kwargs[kwarg] for field, kwarg in lookups.items()}
+
+    def get_parent(self):
+        if self._parent is None:
+            self._parent = get_object_or_404(
+                self.parent_model,
+                **self.get_lookup_values(self.parent_lookups))
+        return self._parent
+
+    def get_queryset(self):
+        return super().get_queryset().filter(
+            **self.get_lookup_values(self.child_lookups))
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if not page:
+            self.get_parent()
+        return page
+
+
+class ValuesReadMixin:
+    """list и retrieve через читателя из api.readers вместо сериализатора
+
+    Запись по-прежнему идёт через сериализаторы. Права на объект
+    проверяются по строке .values(), поэтому для безопасных методов
+    они не должны обращаться к атрибутам объекта. Параметр
+    ?fields=id,name ограничивает поля ответа и столбцы запроса,
+    ?related=id заменяет связанные объекты их id. Время читателя
+    попадает в метрику serialize заголовка Server-Timing.
+    """
+    reader_class = None
+    fields_query_param = 'fields'
+    related_query_param = 'related'
+
+    def get_reader(self):
+        params = self.request.query_params
+        fields = params.get(self.fields_query_param, '')
+        related = params.get(self.related_query_param)
+        if related not in (None, 'id'):
+            raise ValidationError(
+                {self.related_query_param: 'Допустимое значение: id'})
+        return self.reader_class(
+            [name.strip() for name in fields.split(',') if name.strip()],
+            related_ids=related == 'id')
+
+    def list(self, request, *args, **kwargs):
+        reader = self.get_reader()
+        queryset = reader.prepare(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            with serializing():
+                data = reader.read(page)
+            return self.get_paginated_response(data)
+        with serializing():
+            data = reader.read(queryset)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        reader = self.get_reader()
+        queryset = reader.prepare(self.filter_queryset(self.get_queryset()))
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(request, row)
+        with serializing():
+            data = reader.read([row])[0]
+        return Response(data)
+
+
+class CreateListDestroyMixinSet(AnonymousCacheMixin,
+                                mixins.CreateModelMixin,
                                 mixins.ListModelMixin,
                                 mixins.DestroyModelMixin,
                                 viewsets.GenericViewSet):
@@ -11,3 +194,20 @@ class CreateListDestroyMixinSet(mixins.CreateModelMixin,
     filter_backends = [filters.SearchFilter]
     search_fields = ['name']
     lookup_field = 'slug'
+    autocomplete_index = None
+    autocomplete_limit = 10
+    autocomplete_max_limit = 50
+
+    @action(detail=False, pagination_class=None)
+    def autocomplete(self, request):
+        """Подсказки по началу названия или слага без запросов к БД"""
+        try:
+            limit = int(request.query_params.get(
+                'limit', self.autocomplete_limit))
+        except ValueError:
+            limit = self.autocomplete_limit
+        limit = max(1, min(limit, self.autocomplete_max_limit))
+        prefix = request.query_params.get('q', '').strip()
+        if not prefix:
+            return Response([])
+        return Response(self.autocomplete_index.search(prefix, limit))
@@ -0,0 +1,43 @@
+from rest_framework import pagination
+
+
+class PubDateCursorPagination(pagination.CursorPagination):
+    """Курсорная пагинация по дате публикации, id разрешает совпадения"""
+    ordering = ('pub_date', 'id')
+
+
+class PageNumberOrCursorPagination(pagination.PageNumberPagination):
+    """Постраничная пагинация с курсорным режимом по запросу
+
+    Курсорный режим включается параметром `?pagination=cursor`, ссылки
+    `next` и `previous` в ответе содержат параметр `cursor`. Такой ответ
+    не содержит `count`, а страница выбирается по индексу без OFFSET.
+    """
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+    cursor_pagination_class = PubDateCursorPagination
+    cursor_paginator = None
+
+    def is_cursor_mode(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == self.cursor_mode
+            or self.cursor_pagination_class.cursor_query_param
+            in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.is_cursor_mode(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
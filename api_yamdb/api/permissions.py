@@ -2,12 +2,22 @@ from rest_framework import permissions
 
 from reviews.models import UserRole
 
+# Роль и id пользователя берутся из токена (api.authentication), а у
+# объекта сравнивается author_id, поэтому проверки прав не ходят в БД
+
+
+def is_admin(user):
+    return user.is_authenticated and (
+        user.role == UserRole.ADMIN.value or user.is_superuser)
+
+
+def is_moderator(user):
+    return user.is_authenticated and user.role == UserRole.MODERATOR.value
+
 
 class IsAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
-        if request.user.is_authenticated:
-            is_admin = request.user.role == UserRole.ADMIN.value
-            return is_admin or request.user.is_superuser
+        return is_admin(request.user)
 
 
 class IsAdminModerator(permissions.BasePermission):
@@ -17,9 +27,9 @@ class IsAdminModerator(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         return (request.method in permissions.SAFE_METHODS
-                or request.user.role == UserRole.ADMIN.value
-                or request.user.role == UserRole.MODERATOR.value
-                or obj.author == request.user)
+                or obj.author_id == request.user.id
+                or is_admin(request.user)
+                or is_moderator(request.user))
 
 
 class IsAnon(permissions.BasePermission):
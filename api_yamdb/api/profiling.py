@@ -0,0 +1,170 @@
+"""Профилирование запросов: время SQL, сериализации и отрисовки ответа"""
+import cProfile
+import os
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+
+current_profile = ContextVar('current_profile', default=None)
+
+
+class RequestProfile:
+    """Счётчики одного запроса, из которых строится заголовок Server-Timing"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = Counter()
+        self.sql_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+        self.render_started = None
+        self.render_time = 0.0
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries[sql, repr(params)] += 1
+
+    def rendered(self, response):
+        self.render_time = time.perf_counter() - self.render_started
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def duplicate_count(self):
+        """Сколько запросов повторяли уже выполненный с теми же параметрами"""
+        return self.query_count - len(self.queries)
+
+    def server_timing(self):
+        total = time.perf_counter() - self.started
+        metrics = (
+            ('total', total, None),
+            ('sql', self.sql_time,
+             f'{self.query_count} queries ({self.duplicate_count} duplicate)'),
+            ('serialize', self.serializer_time, None),
+            ('render', self.render_time, None),
+        )
+        return ', '.join(
+            f'{name};dur={seconds * 1000:.2f}'
+            + (f';desc="{description}"' if description else '')
+            for name, seconds, description in metrics
+        )
+
+
+@contextmanager
+def serializing():
+    """Учесть время блока как время сериализации текущего запроса
+
+    Вложенные блоки не учитываются повторно. Без профилирования
+    ничего не делает.
+    """
+    profile = current_profile.get()
+    if profile is None or profile.serializing:
+        yield
+        return
+    profile.serializing = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.serializing = False
+        profile.serializer_time += time.perf_counter() - started
+
+
+def timed_data(data):
+    """Обернуть BaseSerializer.data, чтобы учитывать время сериализации"""
+
+    def wrapper(serializer):
+        with serializing():
+            return data.fget(serializer)
+
+    wrapper.profiled = True
+    wrapper.original = data
+    return property(wrapper)
+
+
+def install():
+    """Обернуть BaseSerializer.data для учёта времени сериализации
+
+    Вызывается при первом профилируемом запросе, так что без
+    профилирования сериализаторы работают без обёртки.
+    """
+    if not getattr(BaseSerializer.data.fget, 'profiled', False):
+        BaseSerializer.data = timed_data(BaseSerializer.data)
+
+
+class ProfilingMiddleware:
+    """Добавляет к ответу заголовок Server-Timing
+
+    Включается для всех запросов настройкой API_PROFILING или для
+    отдельного запроса заголовком X-Profile: 1, если разрешено
+    API_PROFILING_HEADER. Если задан API_PROFILING_DIR, доля
+    API_PROFILING_SAMPLE_RATE профилируемых запросов дополнительно
+    сохраняется туда в формате cProfile.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def is_enabled(self, request):
+        return settings.API_PROFILING or (
+            settings.API_PROFILING_HEADER
+            and request.META.get(PROFILE_HEADER) == '1')
+
+    def __call__(self, request):
+        if not self.is_enabled(request):
+            return self.get_response(request)
+        install()
+        profile = RequestProfile()
+        profiler = self.sampled_profiler()
+        token = current_profile.set(profile)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(profile.execute))
+                if profiler is not None:
+                    profiler.enable()
+                response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            current_profile.reset(token)
+        response['Server-Timing'] = profile.server_timing()
+        if profiler is not None:
+            self.dump(profiler, request)
+        return response
+
+    def process_template_response(self, request, response):
+        profile = current_profile.get()
+        if profile is not None:
+            profile.render_started = time.perf_counter()
+            response.add_post_render_callback(profile.rendered)
+        return response
+
+    def sampled_profiler(self):
+        if (settings.API_PROFILING_DIR
+                and random.random() < settings.API_PROFILING_SAMPLE_RATE):
+            return cProfile.Profile()
+        return None
+
+    def dump(self, profiler, request):
+        os.makedirs(settings.API_PROFILING_DIR, exist_ok=True)
+        path = re.sub(r'\W+', '-', request.path).strip('-')
+        filename = f'{time.time():.6f}-{request.method}-{path}.prof'
+        profiler.dump_stats(
+            os.path.join(settings.API_PROFILING_DIR, filename))
@@ -0,0 +1,142 @@
+"""Массовое создание и обновление пользователей"""
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import as_serializer_error
+
+from reviews.models import User
+
+from .authentication import new_confirmation_code, user_states
+from .cache import bump_versions
+from .serializers import UniqueUserMixin, UserBulkSerializer
+
+DUPLICATE_MESSAGES = {
+    'username': 'Имя пользователя повторяется в загрузке',
+    'email': 'Email повторяется в загрузке',
+}
+
+
+def chunks(values, size):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class UserProvisioner:
+    """Создаёт новых и обновляет существующих пользователей списком строк
+
+    Строки проверяются одним экземпляром UserBulkSerializer, а
+    уникальность username и email — запросами на весь набор: строка с
+    существующим username обновляет этого пользователя, email не должен
+    принадлежать другому. Корректные строки записываются bulk_create и
+    bulk_update в одной транзакции, строки с ошибками пропускаются.
+    """
+
+    def __init__(self, rows):
+        if not isinstance(rows, list):
+            raise ValidationError('Ожидается список пользователей')
+        limit = settings.BULK_USERS_MAX_ROWS
+        if len(rows) > limit:
+            raise ValidationError(
+                f'За один запрос можно загрузить не больше {limit} '
+                f'пользователей')
+        self.rows = rows
+        self.batch_size = settings.BULK_USERS_BATCH_SIZE
+        self.results = [None] * len(rows)
+        self.created = []
+        self.updated = []
+        self.update_fields = set()
+
+    def result(self, index, status, username, errors=None):
+        self.results[index] = {'index': index, 'username': username,
+                               'status': status}
+        if errors:
+            self.results[index]['errors'] = errors
+
+    def fail(self, index, errors):
+        row = self.rows[index]
+        username = row.get('username') if isinstance(row, dict) else None
+        self.result(index, 'failed', username, errors)
+
+    def validate_rows(self):
+        """Проверить поля строк и повторы внутри загрузки"""
+        serializer = UserBulkSerializer()
+        seen = {field: set() for field in DUPLICATE_MESSAGES}
+        valid = []
+        for index, row in enumerate(self.rows):
+            try:
+                data = serializer.run_validation(row)
+            except ValidationError as exc:
+                self.fail(index, as_serializer_error(exc))
+                continue
+            errors = {}
+            for field, values in seen.items():
+                if data[field] in values:
+                    errors[field] = [DUPLICATE_MESSAGES[field]]
+                values.add(data[field])
+            if errors:
+                self.fail(index, errors)
+            else:
+                valid.append((index, data))
+        return valid
+
+    def existing_users(self, usernames):
+        users = {}
+        for chunk in chunks(usernames, self.batch_size):
+            users.update(
+                (user.username, user)
+                for user in User.objects.filter(username__in=chunk))
+        return users
+
+    def email_owners(self, emails):
+        owners = {}
+        for chunk in chunks(emails, self.batch_size):
+            owners.update(User.objects.filter(
+                email__in=chunk).values_list('email', 'username'))
+        return owners
+
+    def validate(self):
+        valid = self.validate_rows()
+        existing = self.existing_users(data['username'] for _, data in valid)
+        owners = self.email_owners(data['email'] for _, data in valid)
+        for index, data in valid:
+            username = data['username']
+            owner = owners.get(data['email'])
+            if owner is not None and owner != username:
+                self.fail(index, {
+                    'email': [UniqueUserMixin.UNIQUE_MESSAGES['email']]})
+                continue
+            user = existing.get(username)
+            if user is None:
+                self.created.append(
+                    User(**data, confirmation_code=new_confirmation_code())
+                )
+                self.result(index, 'created', username)
+                continue
+            # обновляются только поля, переданные в строке
+            fields = [field for field in data
+                      if field in self.rows[index] and field != 'username']
+            for field in fields:
+                setattr(user, field, data[field])
+            self.update_fields.update(fields)
+            self.updated.append(user)
+            self.result(index, 'updated', username)
+
+    def save(self):
+        with transaction.atomic():
+            User.objects.bulk_create(self.created, batch_size=self.batch_size)
+            if self.updated:
+                User.objects.bulk_update(
+                    self.updated, sorted(self.update_fields),
+                    batch_size=self.batch_size)
+                # bulk_update не отправляет post_save
+                for user in self.updated:
+                    user_states.invalidate(user.pk)
+                bump_versions('users')
+
+    def summary(self):
+        counts = Counter(result['status'] for result in self.results)
+        return {'created': counts['created'], 'updated': counts['updated'],
+                'failed': counts['failed'], 'results': self.results}
@@ -0,0 +1,118 @@
+"""Ответы list и retrieve из строк .values() без сериализаторов
+
+Каждый читатель повторяет вывод сериализатора для чтения: те же ключи
+в том же порядке и те же значения. Связанные поля берутся через JOIN
+в запросе страницы, жанры произведений — одним запросом на страницу.
+Если запрошена часть полей или только id связанных объектов, в запрос
+попадают только нужные столбцы и соединения.
+"""
+from collections import defaultdict
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import DateTimeField
+
+from reviews.models import TitleGenre
+
+to_datetime = DateTimeField().to_representation
+
+
+def column(lookup, convert=None):
+    """Поле ответа из одного поля .values()"""
+    if convert is None:
+        return (lookup,), lambda reader, row: row[lookup]
+    return (lookup,), lambda reader, row: convert(row[lookup])
+
+
+class ValuesReader:
+    # Поле ответа -> (поля .values(), функция от читателя и строки)
+    columns = {}
+    # Замены columns для связанных объектов, когда нужны только их id
+    id_columns = {}
+    # Поля .values(), нужные всегда: для жанров и курсорной пагинации
+    required = ('id',)
+
+    def __init__(self, fields=None, related_ids=False):
+        if related_ids:
+            self.columns = {**self.columns, **self.id_columns}
+        if fields:
+            unknown = set(fields) - set(self.columns)
+            if unknown:
+                raise ValidationError({'fields': (
+                    f'Неизвестные поля: {", ".join(sorted(unknown))}')})
+        self.fields = [name for name in self.columns
+                       if not fields or name in fields]
+
+    def prepare(self, queryset):
+        lookups = dict.fromkeys(self.required)
+        for name in self.fields:
+            lookups.update(dict.fromkeys(self.columns[name][0]))
+        return queryset.prefetch_related(None).values(*lookups)
+
+    def read(self, rows):
+        getters = [(name, self.columns[name][1]) for name in self.fields]
+        return [{name: getter(self, row) for name, getter in getters}
+                for row in rows]
+
+
+class TitleReader(ValuesReader):
+    """Вывод TitleSerializer"""
+
+    def genre(self, row):
+        return self.genres[row['id']]
+
+    def category(self, row):
+        if row['category_id'] is None:
+            return None
+        return {'name': row['category__name'],
+                'slug': row['category__slug']}
+
+    columns = {
+        'id': column('id'),
+        'name': column('name'),
+        'year': column('year'),
+        'rating': column('rating'),
+        'description': column('description'),
+        'genre': ((), genre),
+        'category': (('category_id', 'category__name', 'category__slug'),
+                     category),
+    }
+
+    def read(self, rows):
+        rows = list(rows)
+        self.genres = defaultdict(list)
+        if 'genre' in self.fields:
+            links = TitleGenre.objects.filter(
+                title_id__in=[row['id'] for row in rows],
+                genre__isnull=False
+            ).order_by('genre__name', 'genre_id').values_list(
+                'title_id', 'genre__name', 'genre__slug')
+            for title_id, name, slug in links:
+                self.genres[title_id].append({'name': name, 'slug': slug})
+        return super().read(rows)
+
+
+class ReviewReader(ValuesReader):
+    """Вывод ReviewSerializer"""
+    required = ('id', 'pub_date')
+    columns = {
+        'id': column('id'),
+        'author': column('author__username'),
+        'title': column('title__name'),
+        'text': column('text'),
+        'score': column('score'),
+        'pub_date': column('pub_date', to_datetime),
+    }
+    id_columns = {'title': column('title_id')}
+
+
+class CommentReader(ValuesReader):
+    """Вывод CommentSerializer"""
+    required = ('id', 'pub_date')
+    columns = {
+        'id': column('id'),
+        'author': column('author__username'),
+        'review': column('review__text'),
+        'text': column('text'),
+        'pub_date': column('pub_date', to_datetime),
+    }
+    id_columns = {'review': column('review_id')}
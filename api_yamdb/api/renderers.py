@@ -0,0 +1,47 @@
+from django.utils.datastructures import MultiValueDict
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+LINE_SEPARATORS = (
+    (b'\xe2\x80\xa8', b'\\u2028'),
+    (b'\xe2\x80\xa9', b'\\u2029'),
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson с тем же результатом для ответов API
+
+    Ответ с отступами, настройки UNICODE_JSON, COMPACT_JSON или
+    STRICT_JSON, отличные от умолчаний, а также данные, которые orjson не умеет
+    сериализовать, отрисовываются стандартным JSONRenderer. Значения,
+    которые orjson не знает (даты, Decimal, ленивые строки), проходят
+    через JSONEncoder.default, как и у DRF. Отличаться может только
+    запись чисел с плавающей точкой в экспоненциальной форме.
+    """
+
+    options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+               if orjson else None)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii
+                or not self.compact or not self.strict
+                or self.get_indent(accepted_media_type,
+                                   renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        if isinstance(data, MultiValueDict):
+            # json берёт последние значения через items(), orjson видит списки
+            data = data.dict()
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default,
+                option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        for separator, escaped in LINE_SEPARATORS:
+            if separator in ret:
+                ret = ret.replace(separator, escaped)
+        return ret
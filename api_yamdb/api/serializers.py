@@ -1,4 +1,4 @@
-from django.shortcuts import get_object_or_404
+from django.db.models import Q
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
@@ -73,18 +73,82 @@ class ReviewSerializer(serializers.ModelSerializer):
 
     def validate(self, data):
         request = self.context['request']
-        author = request.user
-        title_id = self.context['view'].kwargs.get('title_id')
-        title = get_object_or_404(Title, pk=title_id)
         if request.method == 'POST':
-            if Review.objects.filter(title=title, author=author).exists():
+            title = self.context['view'].get_parent()
+            if Review.objects.filter(
+                    title=title, author_id=request.user.id).exists():
                 raise ValidationError(
                     'Вы не можете повторно подписаться на автора'
                 )
         return data
 
 
-class UserSerializer(serializers.ModelSerializer):
+class ReviewSearchSerializer(serializers.ModelSerializer):
+    author = serializers.SlugRelatedField(
+        slug_field='username',
+        read_only=True
+    )
+    snippet = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Review
+        fields = ['id', 'title', 'author', 'score', 'pub_date', 'snippet']
+
+
+class CommentSearchSerializer(serializers.ModelSerializer):
+    author = serializers.SlugRelatedField(
+        slug_field='username',
+        read_only=True
+    )
+    title = serializers.IntegerField(
+        source='review.title_id', read_only=True)
+    snippet = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ['id', 'title', 'review', 'author', 'pub_date', 'snippet']
+
+
+# Имена, совпадающие с адресами действий /users/me/ и /users/bulk/
+RESERVED_USERNAMES = ('me', 'bulk')
+
+
+class UniqueUserMixin:
+    """Проверка уникальности username и email одним запросом
+
+    Проверка заранее не защищает от гонки двух одинаковых запросов,
+    поэтому IntegrityError при записи тоже превращается в ответ 400
+    с ошибкой UNIQUE_ERROR.
+    """
+    UNIQUE_MESSAGES = {
+        'username': 'Пользователь с таким именем уже зарегистрирован',
+        'email': 'Пользователь с таким email уже зарегистрирован',
+    }
+    UNIQUE_ERROR = 'Пользователь с таким именем или email уже зарегистрирован'
+    # False, если уникальность проверяется сразу для набора строк
+    check_unique = True
+
+    def validate(self, data):
+        values = {field: data[field] for field in self.UNIQUE_MESSAGES
+                  if field in data}
+        if values and self.check_unique:
+            query = Q()
+            for field, value in values.items():
+                query |= Q(**{field: value})
+            taken = User.objects.filter(query)
+            if self.instance is not None:
+                taken = taken.exclude(pk=self.instance.pk)
+            errors = {}
+            for row in taken.values(*values):
+                for field, value in values.items():
+                    if row[field] == value:
+                        errors[field] = [self.UNIQUE_MESSAGES[field]]
+            if errors:
+                raise serializers.ValidationError(errors)
+        return super().validate(data)
+
+
+class UserSerializer(UniqueUserMixin, serializers.ModelSerializer):
     username = serializers.RegexField(regex=r'^[\w.@+-]+\Z', max_length=150)
     first_name = serializers.CharField(max_length=150, required=False)
     last_name = serializers.CharField(max_length=150, required=False)
@@ -107,38 +171,25 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
 
     def validate_username(self, username):
-        if username == 'me':
+        if username in RESERVED_USERNAMES:
             raise serializers.ValidationError(
                 'Недопустимое имя пользователя!'
             )
-        duplicated_username = User.objects.filter(
-            username=username
-        ).exists()
-        if duplicated_username:
-            raise serializers.ValidationError(
-                'Пользователь с таким именем уже зарегистрирован'
-            )
         return username
 
-    def validate_email(self, email):
-        duplicated_email = User.objects.filter(email=email).exists()
-        if duplicated_email:
-            raise serializers.ValidationError(
-                'Пользователь с таким email уже зарегистрирован'
-            )
-        return email
+
+class UserBulkSerializer(UserSerializer):
+    """Строка массовой загрузки пользователей"""
+    check_unique = False
 
 
-class GetCodeSerializer(serializers.Serializer):
+class GetCodeSerializer(UniqueUserMixin, serializers.Serializer):
     email = serializers.EmailField(max_length=254, required=True)
     username = serializers.RegexField(regex=r'^[\w.@+-]+\Z', max_length=150)
 
     def validate_username(self, username):
         return UserSerializer.validate_username(self, username)
 
-    def validate_email(self, email):
-        return UserSerializer.validate_email(self, email)
-
 
 class GetTokenSerializer(serializers.Serializer):
     username = serializers.CharField(required=True)
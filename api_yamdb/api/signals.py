@@ -0,0 +1,86 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleGenre, User)
+
+from .authentication import user_states
+from .autocomplete import category_index, genre_index
+from .cache import bump_versions
+
+
+def title_scopes(title):
+    return ('titles', f'title:{title.pk}', f'reviews:{title.pk}')
+
+
+def title_genre_scopes(title_genre):
+    return ('titles', f'title:{title_genre.title_id}')
+
+
+def review_scopes(review):
+    return ('titles', f'title:{review.title_id}',
+            f'reviews:{review.title_id}', f'comments:{review.pk}')
+
+
+def comment_scopes(comment):
+    return (f'comments:{comment.review_id}',)
+
+
+# Индексы автодополнения, в которых учитывается модель
+AUTOCOMPLETE_INDEXES = {
+    Genre: (genre_index,),
+    Category: (category_index,),
+    Title: (category_index, genre_index),
+    TitleGenre: (genre_index,),
+}
+
+# Области кэша и ETag, которые зависят от изменённого объекта
+CACHE_SCOPES = {
+    Title: title_scopes,
+    TitleGenre: title_genre_scopes,
+    Review: review_scopes,
+    Comment: comment_scopes,
+    Genre: lambda genre: ('genres', 'titles'),
+    Category: lambda category: ('categories', 'titles'),
+}
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_state(sender, instance, created=False, **kwargs):
+    user_states.invalidate(instance.pk)
+    if not created:
+        # имя автора выводится в отзывах и комментариях
+        bump_versions('users')
+
+
+def invalidate_cache(sender, instance, **kwargs):
+    bump_versions(*CACHE_SCOPES[sender](instance))
+
+
+for model in CACHE_SCOPES:
+    post_save.connect(invalidate_cache, sender=model)
+    post_delete.connect(invalidate_cache, sender=model)
+
+
+def invalidate_autocomplete(sender, **kwargs):
+    for index in AUTOCOMPLETE_INDEXES[sender]:
+        transaction.on_commit(index.invalidate)
+
+
+for model in AUTOCOMPLETE_INDEXES:
+    post_save.connect(invalidate_autocomplete, sender=model)
+    post_delete.connect(invalidate_autocomplete, sender=model)
+
+
+@receiver(m2m_changed, sender=TitleGenre)
+def invalidate_title_genres(sender, instance, action, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    invalidate_autocomplete(TitleGenre)
+    if isinstance(instance, Title):
+        title_ids = [instance.pk]
+    else:
+        title_ids = pk_set or []
+    bump_versions(
+        'titles', *(f'title:{title_id}' for title_id in title_ids))
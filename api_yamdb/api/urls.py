@@ -1,8 +1,8 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (CategoryViewSet, CommentViewSet,
-                    GenreViewSet, ReviewViewSet,
+from .views import (CategoryViewSet, CommentSearchViewSet, CommentViewSet,
+                    GenreViewSet, ReviewSearchViewSet, ReviewViewSet,
                     TitleViewSet, UserViewSet,
                     get_confirmation_code, get_token)
 
@@ -17,6 +17,10 @@ router.register(r'titles/(?P<title_id>\d+)/reviews',
                 ReviewViewSet, basename='reviews')
 router.register(r'titles/(?P<title_id>\d+)/reviews/(?P<review_id>\d+)'
                 r'/comments', CommentViewSet, basename='comments')
+router.register('search/reviews', ReviewSearchViewSet,
+                basename='search-reviews')
+router.register('search/comments', CommentSearchViewSet,
+                basename='search-comments')
 
 urlpatterns = [
     path('v1/auth/signup/', get_confirmation_code, name='get_code'),
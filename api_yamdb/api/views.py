@@ -1,43 +1,67 @@
-from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db.models import Avg
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, status, viewsets
+from rest_framework import filters, mixins, status, viewsets
 from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import AccessToken
-from reviews.models import (Category, Genre, Review,
+from reviews.models import (Category, Comment, Genre, Review,
                             Title, User, UserRole)
+from reviews.outbox import enqueue_email
+from reviews.search import get_search_backend
 
+from .authentication import get_access_token, new_confirmation_code
+from .autocomplete import category_index, genre_index
 from .filters import TitleFilter
-from .mixins import CreateListDestroyMixinSet
+from .mixins import (AnonymousCacheMixin, ConditionalGetMixin,
+                     CreateListDestroyMixinSet, NestedResourceMixin,
+                     ValuesReadMixin)
+from .pagination import PageNumberOrCursorPagination
+from .parsers import FastJSONParser, NDJSONParser
 from .permissions import IsAdmin, IsAdminModerator, IsAnon
-from .serializers import (CategorySerializer, CommentSerializer,
-                          GenreSerializer, GetCodeSerializer,
-                          GetTokenSerializer, ReviewSerializer,
+from .provisioning import UserProvisioner
+from .readers import CommentReader, ReviewReader, TitleReader
+from .serializers import (CategorySerializer, CommentSearchSerializer,
+                          CommentSerializer, GenreSerializer,
+                          GetCodeSerializer, GetTokenSerializer,
+                          ReviewSearchSerializer, ReviewSerializer,
                           TitleCUDSerializer, TitleSerializer,
-                          UserSerializer)
+                          UniqueUserMixin, UserSerializer)
 
 
 class CategoryViewSet(CreateListDestroyMixinSet):
     queryset = Category.objects.all().order_by('name')
     serializer_class = CategorySerializer
+    cache_scopes = ('categories',)
+    autocomplete_index = category_index
 
 
 class GenreViewSet(CreateListDestroyMixinSet):
     queryset = Genre.objects.all().order_by('name')
     serializer_class = GenreSerializer
+    cache_scopes = ('genres',)
+    autocomplete_index = genre_index
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(ConditionalGetMixin, AnonymousCacheMixin,
+                   ValuesReadMixin, viewsets.ModelViewSet):
     permission_classes = [IsAnon | IsAdmin]
     filter_backends = [DjangoFilterBackend]
     filterset_class = TitleFilter
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')).all().order_by('-id')
+    queryset = Title.objects.select_related('category').prefetch_related(
+        Prefetch('genre', Genre.objects.order_by('name', 'id'))
+    ).order_by('-id')
+    reader_class = TitleReader
+
+    def get_cache_scopes(self):
+        if self.action == 'retrieve':
+            return (f'title:{self.kwargs["pk"]}', 'genres', 'categories')
+        return ('titles',)
 
     def get_serializer_class(self):
         if self.request.method in ['POST', 'PATCH']:
@@ -45,35 +69,75 @@ class TitleViewSet(viewsets.ModelViewSet):
         return TitleSerializer
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, ValuesReadMixin,
+                    NestedResourceMixin, viewsets.ModelViewSet):
     permission_classes = [IsAdminModerator]
+    queryset = Review.objects.all()
     serializer_class = ReviewSerializer
+    reader_class = ReviewReader
+    parent_model = Title
+    parent_lookups = {'pk': 'title_id'}
+    child_lookups = {'title_id': 'title_id'}
+    pagination_class = PageNumberOrCursorPagination
 
-    def perform_create(self, serializer):
-        title_id = self.kwargs.get('title_id')
-        title = get_object_or_404(Title, id=title_id)
-        serializer.save(author=self.request.user, title=title)
+    def get_cache_scopes(self):
+        return (f'reviews:{self.kwargs["title_id"]}', 'users')
 
-    def get_queryset(self):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        return title.reviews.all()
+    def perform_create(self, serializer):
+        serializer.save(author_id=self.request.user.id,
+                        title=self.get_parent())
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, ValuesReadMixin,
+                     NestedResourceMixin, viewsets.ModelViewSet):
     permission_classes = [IsAdminModerator]
+    queryset = Comment.objects.all()
     serializer_class = CommentSerializer
+    reader_class = CommentReader
+    parent_model = Review
+    parent_lookups = {'pk': 'review_id', 'title_id': 'title_id'}
+    child_lookups = {'review_id': 'review_id', 'review__title_id': 'title_id'}
+    pagination_class = PageNumberOrCursorPagination
+
+    def get_cache_scopes(self):
+        return (f'comments:{self.kwargs["review_id"]}', 'users')
 
     def perform_create(self, serializer):
-        title_id = self.kwargs.get('title_id')
-        review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(Review, id=review_id, title=title_id)
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author_id=self.request.user.id,
+                        review=self.get_parent())
+
+
+class SearchViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Полнотекстовый поиск с отрывком текста, параметр q обязателен"""
+    permission_classes = [AllowAny]
 
     def get_queryset(self):
-        title_id = self.kwargs.get('title_id')
-        review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(Review, id=review_id, title=title_id)
-        return review.comments.all()
+        query = self.request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': 'Укажите поисковый запрос'})
+        backend = get_search_backend()
+        return backend.with_snippet(
+            backend.search(self.queryset, query), query)
+
+
+class ReviewSearchViewSet(SearchViewSet):
+    queryset = Review.objects.select_related('author')
+    serializer_class = ReviewSearchSerializer
+
+
+class CommentSearchViewSet(SearchViewSet):
+    queryset = Comment.objects.select_related('author', 'review')
+    serializer_class = CommentSearchSerializer
+
+
+@contextmanager
+def unique_user_errors():
+    """Нарушение уникальности username или email при записи — ответ 400"""
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError:
+        raise ValidationError(UniqueUserMixin.UNIQUE_ERROR)
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -85,11 +149,29 @@ class UserViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAdmin]
     lookup_field = 'username'
 
+    def perform_create(self, serializer):
+        with unique_user_errors():
+            serializer.save(confirmation_code=new_confirmation_code())
+
+    def perform_update(self, serializer):
+        with unique_user_errors():
+            serializer.save()
+
+    @action(methods=['post'], detail=False,
+            parser_classes=[FastJSONParser, NDJSONParser])
+    def bulk(self, request):
+        """Создать или обновить пользователей из JSON-массива или NDJSON"""
+        provisioner = UserProvisioner(request.data)
+        provisioner.validate()
+        with unique_user_errors():
+            provisioner.save()
+        return Response(provisioner.summary(), status.HTTP_200_OK)
+
     @action(methods=['get', 'patch'], detail=False,
             permission_classes=[IsAuthenticated])
     def me(self, request):
         if request.method == 'GET':
-            user = self.request.user
+            user = get_object_or_404(User, id=request.user.id)
             serializer = UserSerializer(user)
             return Response(serializer.data, status.HTTP_200_OK)
 
@@ -105,7 +187,8 @@ class UserViewSet(viewsets.ModelViewSet):
                 partial=True
             )
             serializer.is_valid(raise_exception=True)
-            serializer.save()
+            with unique_user_errors():
+                serializer.save()
             return Response(
                 data=serializer.data,
                 status=status.HTTP_200_OK
@@ -124,22 +207,17 @@ def get_confirmation_code(request):
     serializer.is_valid(raise_exception=True)
     email = serializer.validated_data.get('email')
     username = serializer.validated_data.get('username')
-    try:
-        user, exist = User.objects.get_or_create(
+    confirmation_code = new_confirmation_code()
+    with unique_user_errors():
+        User.objects.create(
             username=username,
             email=email,
-            is_active=False
+            is_active=False,
+            confirmation_code=confirmation_code
         )
-    except Exception:
-        return Response(request.data,
-                        status=status.HTTP_400_BAD_REQUEST)
-    confirmation_code = default_token_generator.make_token(user)
-    User.objects.filter(username=username).update(
-        confirmation_code=confirmation_code
-    )
     subject = 'Регистрация на YAMDB'
     message = f'Код подтверждения: {confirmation_code}'
-    send_mail(subject, message, 'YAMDB', [email])
+    enqueue_email(subject, message, 'YAMDB', [email])
     return Response(
         request.data,
         status=status.HTTP_200_OK
@@ -156,7 +234,7 @@ def get_token(request):
     confirmation_code = serializer.validated_data.get('confirmation_code')
     user = get_object_or_404(User, username=username)
     if confirmation_code == user.confirmation_code:
-        token = AccessToken.for_user(user)
+        token = get_access_token(user)
         return Response({'token': f'{token}'}, status=status.HTTP_200_OK)
     return Response({'confirmation_code': 'Неверный код подтверждения'},
                     status=status.HTTP_400_BAD_REQUEST)
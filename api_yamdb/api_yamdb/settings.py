@@ -30,6 +30,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -68,6 +70,42 @@ DATABASES = {
     }
 }
 
+# Cache
+# Для нескольких процессов на одной машине подойдёт FileBasedCache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Кэш ответов API для анонимных пользователей, см. api.cache
+# Версии в ключах хранятся в БД, поэтому кэш в памяти процесса безопасен
+# и при нескольких процессах: запись в любом из них меняет ключи у всех
+API_CACHE_ALIAS = 'default'
+API_RESPONSE_CACHE_TIMEOUT = 300
+
+# Как долго индекс автодополнения жанров и категорий живёт без перестройки
+AUTOCOMPLETE_MAX_AGE = 60
+
+# Заголовок Server-Timing с разбивкой времени запроса: для всех запросов
+# или только для запросов с заголовком X-Profile: 1
+API_PROFILING = False
+API_PROFILING_HEADER = DEBUG
+# Каталог для дампов cProfile и доля профилируемых запросов, которые туда
+# попадают
+API_PROFILING_DIR = None
+API_PROFILING_SAMPLE_RATE = 0.01
+
+# Каталог, через который воркеры складывают метрики для /metrics; без него
+# каждый процесс отдаёт только свои счётчики
+METRICS_DIR = None
+METRICS_FLUSH_INTERVAL = 1.0
+
+# Массовая загрузка пользователей: строк за запрос и строк в одном
+# запросе к БД (SQLite ограничивает число параметров запроса)
+BULK_USERS_MAX_ROWS = 50000
+BULK_USERS_BATCH_SIZE = 500
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.%s' % validator}
@@ -107,7 +145,16 @@ REST_FRAMEWORK = {
         'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5,
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.TokenUserAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 }
 
@@ -116,5 +163,13 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Сколько секунд верить закэшированному состоянию пользователя из токена
+TOKEN_USER_CACHE_TTL = 60
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+# Письма ставятся в очередь и отправляются командой send_emails.
+# С EMAIL_OUTBOX_EAGER = True очередь отправляется сразу после записи,
+# то есть в запросе регистрации.
+EMAIL_OUTBOX_EAGER = False
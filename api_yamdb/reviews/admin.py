@@ -1,6 +1,8 @@
 from django.contrib import admin
 
-from .models import Category, Genre, Title, User, Review, Comment, TitleGenre
+from .models import (Category, Genre, Title, User, Review, Comment, TitleGenre,
+                     OutgoingEmail)
+from .search import get_search_backend
 
 admin.site.site_header = 'Панель администратора YaMDb'
 admin.site.site_title = 'Панель администратора YaMDb'
@@ -17,11 +19,16 @@ class GenreAdmin(admin.ModelAdmin):
 
 
 class TitleAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'year')
+    list_display = ('id', 'name', 'year', 'rating')
     list_filter = ('year', 'genre', 'category')
     search_fields = ('name', 'description')
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return get_search_backend().search(queryset, search_term), False
+
 
 class UserAdmin(admin.ModelAdmin):
     list_display = (
@@ -65,7 +72,21 @@ class TitleGenreAdmin(admin.ModelAdmin):
     )
 
 
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'recipient',
+        'subject',
+        'created',
+        'sent',
+        'attempts'
+    )
+    list_filter = ('sent',)
+    search_fields = ('recipient',)
+
+
 admin.site.register(TitleGenre, TitleGenreAdmin)
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Review, ReviewAdmin)
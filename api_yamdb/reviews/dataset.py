@@ -0,0 +1,159 @@
+"""Синтетические данные в формате CSV-файлов static/data"""
+import random
+from datetime import datetime, timedelta
+
+WORDS = (
+    'фильм', 'книга', 'сюжет', 'финал', 'герой', 'автор', 'история',
+    'актёр', 'музыка', 'сцена', 'смысл', 'диалог', 'злодей', 'эпизод',
+    'отличный', 'скучный', 'неожиданный', 'слабый', 'сильный', 'долгий',
+    'понравился', 'разочаровал', 'пересмотрю', 'советую', 'затянуто',
+    'очень', 'совсем', 'снова', 'никогда', 'впервые',
+)
+FIRST_DATE = datetime(2015, 1, 1)
+DATE_RANGE = timedelta(days=8 * 365).total_seconds()
+
+
+def skewed(rng, size, power=2):
+    """Случайный индекс от 0 до size - 1, малые индексы выпадают чаще"""
+    return int(size * rng.random() ** power)
+
+
+def allocate(total, weights):
+    """Разделить total между весами в целых числах, сохраняя сумму"""
+    weights = list(weights)
+    weight_sum = sum(weights)
+    carry = 0.0
+    for weight in weights:
+        carry += total * weight / weight_sum
+        share = int(carry)
+        carry -= share
+        yield share
+
+
+class Dataset:
+    """Генератор строк для всех CSV-файлов, которые читает load_csv_data
+
+    Популярность произведений убывает по закону Ципфа с показателем
+    skew: на самые популярные приходится большая часть отзывов и
+    комментариев. Активность пользователей, жанров и категорий тоже
+    неравномерна. При одинаковом seed строки получаются одинаковыми.
+    """
+
+    def __init__(self, users, titles, reviews, comments, genres=20,
+                 categories=5, skew=1.0, seed=0):
+        self.users = users
+        self.titles = titles
+        self.reviews = reviews
+        self.comments = comments
+        self.genres = genres
+        self.categories = categories
+        self.skew = skew
+        self.seed = seed
+
+    def random(self, name):
+        return random.Random(f'{self.seed}:{name}')
+
+    def text(self, rng):
+        words = rng.choices(WORDS, k=rng.randint(5, 40))
+        return ' '.join(words).capitalize() + '.'
+
+    def date(self, rng):
+        moment = FIRST_DATE + timedelta(seconds=rng.random() * DATE_RANGE)
+        return moment.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+    def popularity(self):
+        """Веса произведений по порядку id"""
+        ranks = list(range(1, self.titles + 1))
+        self.random('popularity').shuffle(ranks)
+        return [rank ** -self.skew for rank in ranks]
+
+    def review_counts(self):
+        return [min(count, self.users)
+                for count in allocate(self.reviews, self.popularity())]
+
+    def rows(self, filename):
+        return getattr(self, FILES[filename])()
+
+    def user_rows(self):
+        rng = self.random('users')
+        for pk in range(1, self.users + 1):
+            chance = rng.random()
+            role = ('admin' if chance < 0.002
+                    else 'moderator' if chance < 0.01 else 'user')
+            yield {'id': pk, 'username': f'user{pk}',
+                   'email': f'user{pk}@yamdb.fake', 'role': role,
+                   'bio': '', 'first_name': '', 'last_name': ''}
+
+    def category_rows(self):
+        for pk in range(1, self.categories + 1):
+            yield {'id': pk, 'name': f'Категория {pk}',
+                   'slug': f'category-{pk}'}
+
+    def genre_rows(self):
+        for pk in range(1, self.genres + 1):
+            yield {'id': pk, 'name': f'Жанр {pk}', 'slug': f'genre-{pk}'}
+
+    def title_rows(self):
+        rng = self.random('titles')
+        last_year = datetime.now().year
+        for pk in range(1, self.titles + 1):
+            yield {'id': pk, 'name': f'Произведение {pk}',
+                   'year': rng.randint(1900, last_year),
+                   'category': 1 + skewed(rng, self.categories)}
+
+    def genre_title_rows(self):
+        rng = self.random('genre_title')
+        pk = 0
+        for title_id in range(1, self.titles + 1):
+            genres = {1 + skewed(rng, self.genres)
+                      for _ in range(rng.randint(1, 3))}
+            for genre_id in sorted(genres):
+                pk += 1
+                yield {'id': pk, 'title_id': title_id, 'genre_id': genre_id}
+
+    def authors(self, rng, count):
+        """count разных авторов, чтобы не нарушить unique_review"""
+        if count * 2 > self.users:
+            return sorted(rng.sample(range(1, self.users + 1), count))
+        authors = set()
+        while len(authors) < count:
+            authors.add(1 + skewed(rng, self.users))
+        return sorted(authors)
+
+    def review_rows(self):
+        rng = self.random('reviews')
+        pk = 0
+        for title_id, count in enumerate(self.review_counts(), 1):
+            quality = rng.uniform(2, 9)
+            for author in self.authors(rng, count):
+                pk += 1
+                score = min(10, max(1, round(rng.gauss(quality, 2))))
+                yield {'id': pk, 'title_id': title_id,
+                       'text': self.text(rng), 'author': author,
+                       'score': score, 'pub_date': self.date(rng)}
+
+    def comment_rows(self):
+        """Комментарии к отзывам, id которых идут подряд по произведениям"""
+        rng = self.random('comments')
+        pk = first_review = 0
+        shares = allocate(self.comments, self.popularity())
+        for count, share in zip(self.review_counts(), shares):
+            for _ in range(share if count else 0):
+                pk += 1
+                yield {'id': pk,
+                       'review_id': first_review + 1 + rng.randrange(count),
+                       'text': self.text(rng),
+                       'author': 1 + skewed(rng, self.users),
+                       'pub_date': self.date(rng)}
+            first_review += count
+
+
+FILES = {
+    'users.csv': 'user_rows',
+    'category.csv': 'category_rows',
+    'genre.csv': 'genre_rows',
+    'titles.csv': 'title_rows',
+    'genre_title.csv': 'genre_title_rows',
+    'review.csv': 'review_rows',
+    'comments.csv': 'comment_rows',
+}
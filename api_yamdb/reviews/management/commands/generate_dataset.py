@@ -0,0 +1,113 @@
+import csv
+import os
+import time
+from itertools import islice
+
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+
+from reviews.dataset import Dataset
+from reviews.models import Title
+
+from .load_csv_data import (BATCH_SIZE, TABLES, keep_auto_now_add,
+                            reset_sequences, topological_order)
+
+
+class Command(BaseCommand):
+    help = ('Генерирует синтетические данные в пустую БД '
+            'или в CSV-файлы для load_csv_data')
+
+    def add_arguments(self, parser):
+        sizes = (
+            ('--users', 1000, 'Сколько пользователей создать'),
+            ('--titles', 1000, 'Сколько произведений создать'),
+            ('--reviews', 10000, 'Сколько отзывов создать (примерно)'),
+            ('--comments', 20000, 'Сколько комментариев создать (примерно)'),
+            ('--genres', 20, 'Сколько жанров создать'),
+            ('--categories', 5, 'Сколько категорий создать'),
+        )
+        for option, default, help_text in sizes:
+            parser.add_argument(option, type=int, default=default,
+                                help=help_text)
+        parser.add_argument(
+            '--skew', type=float, default=1.0,
+            help='Показатель распределения Ципфа для популярности'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора, одинаковое зерно даёт одинаковые данные'
+        )
+        parser.add_argument(
+            '--output',
+            help='Каталог для CSV-файлов; без него данные пишутся в БД'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько строк вставлять за раз'
+        )
+
+    def handle(self, *args, **options):
+        dataset = Dataset(
+            users=options['users'], titles=options['titles'],
+            reviews=options['reviews'], comments=options['comments'],
+            genres=options['genres'], categories=options['categories'],
+            skew=options['skew'], seed=options['seed'])
+        started = time.monotonic()
+        if options['output']:
+            total = self.write_csv(dataset, options['output'])
+        else:
+            total = self.insert(dataset, options['batch_size'])
+        self.report('Всего', total, time.monotonic() - started)
+
+    def write_csv(self, dataset, directory):
+        os.makedirs(directory, exist_ok=True)
+        total = 0
+        for table in TABLES:
+            started = time.monotonic()
+            rows = dataset.rows(table.filename)
+            path = os.path.join(directory, table.filename)
+            with open(path, 'w', encoding='utf-8', newline='') as csv_file:
+                writer = None
+                count = 0
+                for row in rows:
+                    if writer is None:
+                        writer = csv.DictWriter(
+                            csv_file, fieldnames=list(row),
+                            lineterminator='\n')
+                        writer.writeheader()
+                    writer.writerow(row)
+                    count += 1
+            self.report(table.filename, count, time.monotonic() - started)
+            total += count
+        return total
+
+    def insert(self, dataset, batch_size):
+        models = [table.model for table in TABLES]
+        if any(model.objects.exists() for model in models):
+            raise CommandError('В БД уже есть данные, нужна пустая БД')
+        total = 0
+        with transaction.atomic():
+            for table in topological_order(TABLES):
+                started = time.monotonic()
+                count = 0
+                rows = (table.to_fields(row)
+                        for row in dataset.rows(table.filename))
+                with keep_auto_now_add(table.model):
+                    while True:
+                        batch = [table.model(**fields)
+                                 for fields in islice(rows, batch_size)]
+                        if not batch:
+                            break
+                        table.model.objects.bulk_create(batch)
+                        count += len(batch)
+                self.report(table.filename, count,
+                            time.monotonic() - started)
+                total += count
+            reset_sequences(models)
+            Title.objects.rebuild_rating()
+        return total
+
+    def report(self, name, rows, elapsed):
+        rate = rows / elapsed if elapsed else rows
+        self.stdout.write(
+            f'{name}: {rows} строк за {elapsed:.2f} с ({rate:.0f} строк/с)')
@@ -1,10 +1,21 @@
+import os
+import pickle
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from csv import DictReader
-from django.core.management import BaseCommand
+from itertools import islice
 
+import django
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
 
-from reviews.models import Category, Genre, Review
-from reviews.models import Title, User, Comment, TitleGenre
-
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleGenre, User)
 
 ALREDY_LOADED_ERROR_MESSAGE = """
 Если вам нужно перезагрузить дочерние данные из CSV-файла,
@@ -12,150 +23,282 @@ ALREDY_LOADED_ERROR_MESSAGE = """
 Затем запустите `python manage.py миграция` для новой пустой
 базы данных с таблицами"""
 
+DATA_DIR = os.path.join(settings.BASE_DIR, 'static', 'data')
+BATCH_SIZE = 1000
+PROGRESS_INTERVAL = 1.0
 
-class User(BaseCommand):
-    help = "Загружает данные из user.csv"
-
-    def handle(self, *args, **options):
-        if User.objects.exists():
-            print('дочерние данные уже загружены... существующие.')
-            print(ALREDY_LOADED_ERROR_MESSAGE)
-            return
-
-        print("Загрузка данных")
-
-        for row in DictReader(
-            open('./static/data/user.csv')
-        ):
-            user = User(
-                id=row['id'], username=row['username'],
-                email=row['email'], role=row['role'],
-                bio=row['bio'], first_name=row['first_name'],
-                last_name=row['last_name']
-            )
-            user.save()
 
+def to_id(value):
+    return int(value) if value else None
 
-class Command(BaseCommand):
-    help = "Загружает данные из category.csv"
 
-    def handle(self, *args, **options):
-        if Category.objects.exists():
-            print('дочерние данные уже загружены... существующие.')
-            print(ALREDY_LOADED_ERROR_MESSAGE)
-            return
+def user_fields(row):
+    return dict(
+        id=to_id(row['id']), username=row['username'],
+        email=row['email'], role=row['role'],
+        bio=row['bio'], first_name=row['first_name'],
+        last_name=row['last_name']
+    )
 
-        print("Загрузка данных")
 
-        for row in DictReader(
-            open('./static/data/category.csv')
-        ):
-            category = Category(
-                id=row['id'], name=row['name'], slug=row['slug']
-            )
-            category.save()
+def category_fields(row):
+    return dict(id=to_id(row['id']), name=row['name'], slug=row['slug'])
 
 
-class Genre(BaseCommand):
+def genre_fields(row):
+    return dict(id=to_id(row['id']), name=row['name'], slug=row['slug'])
 
-    help = "Загружает данные из genre.csv"
 
-    def handle(self, *args, **options):
-        if Genre.objects.exists():
-            print('дочерние данные уже загружены... существующие.')
-            print(ALREDY_LOADED_ERROR_MESSAGE)
-            return
+def title_fields(row):
+    return dict(
+        id=to_id(row['id']), name=row['name'],
+        year=row['year'], category_id=to_id(row['category'])
+    )
 
-        print("Загрузка данных")
 
-        for row in DictReader(
-            open('./static/data/genre.csv')
-        ):
-            genre = Genre(id=row['id'], name=row['name'], slug=row['slug'])
-            genre.save()
+def title_genre_fields(row):
+    return dict(
+        id=to_id(row['id']), title_id=to_id(row['title_id']),
+        genre_id=to_id(row['genre_id'])
+    )
 
 
-class Review(BaseCommand):
-    help = "Загружает данные из review.csv"
+def review_fields(row):
+    return dict(
+        id=to_id(row['id']), title_id=to_id(row['title_id']),
+        text=row['text'], author_id=to_id(row['author']),
+        score=row['score'], pub_date=row['pub_date']
+    )
 
-    def handle(self, *args, **options):
-        if Review.objects.exists():
-            print('дочерние данные уже загружены... существующие.')
-            print(ALREDY_LOADED_ERROR_MESSAGE)
-            return
 
-        print("Загрузка данных")
+def comment_fields(row):
+    return dict(
+        id=to_id(row['id']), review_id=to_id(row['review_id']),
+        text=row['text'], author_id=to_id(row['author']),
+        pub_date=row['pub_date']
+    )
 
-        for row in DictReader(
-            open('./static/data/review.csv')
-        ):
-            review = Review(
-                id=row['id'], title_id=row['title_id'],
-                text=row['text'], author=row['author'],
-                score=row['score'], pub_date=row['pub_date']
-            )
-            review.save()
 
+# references: поле внешнего ключа -> модель, на которую оно ссылается
+Table = namedtuple('Table', ['filename', 'model', 'to_fields', 'references'])
 
-class Command(BaseCommand):
-    help = "Загружает данные из title.csv"
+# Порядок вставки вычисляется по references, см. topological_order
+TABLES = (
+    Table('users.csv', User, user_fields, {}),
+    Table('category.csv', Category, category_fields, {}),
+    Table('genre.csv', Genre, genre_fields, {}),
+    Table('titles.csv', Title, title_fields, {'category_id': Category}),
+    Table('genre_title.csv', TitleGenre, title_genre_fields,
+          {'title_id': Title, 'genre_id': Genre}),
+    Table('review.csv', Review, review_fields,
+          {'title_id': Title, 'author_id': User}),
+    Table('comments.csv', Comment, comment_fields,
+          {'review_id': Review, 'author_id': User}),
+)
 
-    def handle(self, *args, **options):
-        if Title.objects.exists():
-            print('дочерние данные уже загружены... существующие.')
-            print(ALREDY_LOADED_ERROR_MESSAGE)
-            return
 
-        print("Загрузка данных")
+class IdSet:
+    """Множество целых id: битовая карта для малых id, set для остальных
 
-        for row in DictReader(
-            open('./static/data/titles.csv')
-        ):
-            title = Title(
-                id=row['id'], name=row['name'],
-                year=row['year'], category_id=row['category']
-            )
-            title.save()
+    Карта растёт только до BITMAP_LIMIT id (1 МБ), поэтому один большой id
+    не выделяет память под все меньшие.
+    """
 
+    BITMAP_LIMIT = 1 << 23
 
-class Comment(BaseCommand):
-    help = "Загружает данные из comment.csv"
+    def __init__(self):
+        self.bits = bytearray()
+        self.large = set()
 
-    def handle(self, *args, **options):
-        if Comment.objects.exists():
-            print('дочерние данные уже загружены... существующие.')
-            print(ALREDY_LOADED_ERROR_MESSAGE)
+    def add(self, value):
+        if not 0 <= value < self.BITMAP_LIMIT:
+            self.large.add(value)
             return
-
-        print("Загрузка данных")
-
-        for row in DictReader(
-            open('./static/data/comment.csv')
-        ):
-            comment = Comment(
-                id=row['id'], review_id=row['review_id'],
-                text=row['text'], author=row['author'],
-                pub_date=row['pub_date']
-            )
-            comment.save()
+        index, bit = divmod(value, 8)
+        if index >= len(self.bits):
+            self.bits.extend(bytes(index - len(self.bits) + 1))
+        self.bits[index] |= 1 << bit
+
+    def __contains__(self, value):
+        if not 0 <= value < self.BITMAP_LIMIT:
+            return value in self.large
+        index, bit = divmod(value, 8)
+        return index < len(self.bits) and bool(self.bits[index] & 1 << bit)
+
+
+def read_batches(path, to_fields, batch_size):
+    """Читать CSV потоково, отдавая строки пачками не длиннее batch_size"""
+    with open(path, encoding='utf-8', newline='') as csv_file:
+        rows = (to_fields(row) for row in DictReader(csv_file))
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return
+            yield batch
+
+
+def parse_to_file(path, to_fields, batch_size, directory):
+    """Разобрать CSV в рабочем процессе и сохранить пачки во временный файл"""
+    with tempfile.NamedTemporaryFile(
+            dir=directory, suffix='.pickle', delete=False) as parsed:
+        for batch in read_batches(path, to_fields, batch_size):
+            pickle.dump(batch, parsed, pickle.HIGHEST_PROTOCOL)
+    return parsed.name
+
+
+def read_parsed_batches(path):
+    with open(path, 'rb') as parsed:
+        while True:
+            try:
+                yield pickle.load(parsed)
+            except EOFError:
+                return
+
+
+def topological_order(tables):
+    """Упорядочить таблицы так, чтобы родительские шли раньше дочерних"""
+    pending = list(tables)
+    ordered = []
+    loaded = set()
+    while pending:
+        ready = [table for table in pending
+                 if set(table.references.values()) <= loaded]
+        if not ready:
+            raise CommandError('Циклическая зависимость между CSV-файлами')
+        for table in ready:
+            pending.remove(table)
+            ordered.append(table)
+            loaded.add(table.model)
+    return ordered
+
+
+def reset_sequences(models):
+    """Сдвинуть счётчики id после вставки с явными первичными ключами"""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+@contextmanager
+def keep_auto_now_add(model):
+    """Сохранить даты из CSV вместо текущего времени для auto_now_add"""
+    fields = [field for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
 
 
 class Command(BaseCommand):
-    help = "Загружает данные из genre_title.csv"
+    help = "Загружает данные из CSV-файлов static/data"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=DATA_DIR,
+            help='Каталог с CSV-файлами'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько строк держать в памяти и вставлять за раз'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Сколько файлов разбирать параллельно в отдельных процессах'
+        )
 
     def handle(self, *args, **options):
-        if TitleGenre.objects.exists():
-            print('дочерние данные уже загружены... существующие.')
-            print(ALREDY_LOADED_ERROR_MESSAGE)
+        models = [table.model for table in TABLES]
+        if any(model.objects.exists() for model in models):
+            self.stdout.write('дочерние данные уже загружены... существующие.')
+            self.stdout.write(ALREDY_LOADED_ERROR_MESSAGE)
             return
 
-        print("Загрузка данных")
-
-        for row in DictReader(
-            open('./static/data/genre_title.csv')
-        ):
-            titlegenre = TitleGenre(
-                id=row['id'], title_id=row['title_id'],
-                genre_id=row['genre_id']
-            )
-            titlegenre.save()
+        self.stdout.write('Загрузка данных')
+        referenced = {
+            model for table in TABLES for model in table.references.values()}
+        self.known_ids = {model: IdSet() for model in referenced}
+        started = time.monotonic()
+        with transaction.atomic():
+            if options['workers'] > 1:
+                total = self.load_parallel(
+                    options['path'], options['batch_size'],
+                    options['workers'])
+            else:
+                total = sum(
+                    self.load_table(table, read_batches(
+                        os.path.join(options['path'], table.filename),
+                        table.to_fields, options['batch_size']))
+                    for table in topological_order(TABLES)
+                )
+            reset_sequences(models)
+            Title.objects.rebuild_rating()
+        self.report('Всего', total, time.monotonic() - started)
+
+    def load_parallel(self, path, batch_size, workers):
+        """Разобрать все файлы параллельно, вставить в порядке зависимостей
+
+        Файлы не зависят друг от друга при разборе, поэтому рабочие процессы
+        берутся за все сразу. Вставка идёт в основном процессе и ждёт только
+        свой файл, так что время загрузки ограничено самым большим файлом.
+        """
+        total = 0
+        with tempfile.TemporaryDirectory() as directory, ProcessPoolExecutor(
+                max_workers=workers, initializer=django.setup) as pool:
+            parsed = {
+                table.filename: pool.submit(
+                    parse_to_file, os.path.join(path, table.filename),
+                    table.to_fields, batch_size, directory)
+                for table in TABLES
+            }
+            for table in topological_order(TABLES):
+                total += self.load_table(table, read_parsed_batches(
+                    parsed[table.filename].result()))
+        return total
+
+    def load_table(self, table, batches):
+        started = reported = time.monotonic()
+        loaded = skipped = 0
+        for batch in batches:
+            objects = []
+            for fields in batch:
+                if self.has_missing_references(table, fields):
+                    skipped += 1
+                    continue
+                objects.append(table.model(**fields))
+            self.insert(table.model, objects)
+            loaded += len(objects)
+            if time.monotonic() - reported >= PROGRESS_INTERVAL:
+                reported = time.monotonic()
+                self.report(f'{table.filename}...', loaded,
+                            reported - started)
+        self.report(table.filename, loaded, time.monotonic() - started)
+        if skipped:
+            self.stdout.write(
+                f'{table.filename}: пропущено {skipped} строк '
+                f'со ссылками на отсутствующие записи')
+        return loaded
+
+    def has_missing_references(self, table, fields):
+        return any(
+            fields[field] is not None
+            and fields[field] not in self.known_ids[model]
+            for field, model in table.references.items()
+        )
+
+    def insert(self, model, objects):
+        with keep_auto_now_add(model):
+            model.objects.bulk_create(objects)
+        known_ids = self.known_ids.get(model)
+        if known_ids is not None:
+            for obj in objects:
+                known_ids.add(obj.pk)
+
+    def report(self, name, rows, elapsed):
+        rate = rows / elapsed if elapsed else rows
+        self.stdout.write(
+            f'{name}: {rows} строк за {elapsed:.2f} с ({rate:.0f} строк/с)')
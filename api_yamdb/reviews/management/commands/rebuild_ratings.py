@@ -0,0 +1,13 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает хранимый рейтинг произведений по отзывам"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = Title.objects.rebuild_rating()
+        self.stdout.write(f'Рейтинг пересчитан для {updated} произведений')
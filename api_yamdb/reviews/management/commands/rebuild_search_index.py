@@ -0,0 +1,13 @@
+from django.core.management import BaseCommand
+
+from reviews.search import SEARCH_FIELDS, get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Перестраивает полнотекстовые поисковые индексы"
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        for model in SEARCH_FIELDS:
+            backend.rebuild(model)
+            self.stdout.write(f'Индекс {model.__name__} перестроен')
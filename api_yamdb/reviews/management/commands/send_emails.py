@@ -0,0 +1,60 @@
+import time
+
+from django.core.management import BaseCommand
+
+from reviews.outbox import MAX_ATTEMPTS, pending_emails, send_outbox
+
+
+class Command(BaseCommand):
+    help = "Отправляет письма из очереди исходящих писем"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько писем отправлять через одно соединение'
+        )
+        parser.add_argument(
+            '--max-attempts', type=int, default=MAX_ATTEMPTS,
+            help='После скольких неудачных попыток письмо пропускается'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а ждать новые письма'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Пауза в секундах между проверками очереди в режиме --loop'
+        )
+        parser.add_argument(
+            '--max-backoff', type=float, default=60.0,
+            help='Наибольшая пауза в секундах, если отправка не удаётся '
+                 'подряд, в режиме --loop'
+        )
+
+    def handle(self, *args, **options):
+        failures = 0
+        while True:
+            try:
+                sent, failed = send_outbox(
+                    options['batch_size'], options['max_attempts'])
+            except Exception as error:
+                if not options['loop']:
+                    raise
+                self.stderr.write(f'Ошибка отправки: {error!r}')
+                sent, failed = 0, 1
+            if sent or failed:
+                self.stdout.write(
+                    f'Отправлено: {sent}, ошибок: {failed}, в очереди: '
+                    f'{pending_emails(options["max_attempts"]).count()}')
+            # пока ничего не уходит, например SMTP недоступен, пауза
+            # между попытками растёт вдвое до --max-backoff
+            failures = failures + 1 if failed and not sent else 0
+            if failures:
+                if not options['loop']:
+                    return
+                time.sleep(min(options['interval'] * 2 ** failures,
+                               options['max_backoff']))
+            elif sent + failed < options['batch_size']:
+                if not options['loop']:
+                    return
+                time.sleep(options['interval'])
@@ -0,0 +1,51 @@
+from django.db import migrations
+
+CREATE_INDEX = [
+    "CREATE VIRTUAL TABLE reviews_title_fts USING fts5(name, description, "
+    "content='reviews_title', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER reviews_title_fts_ai AFTER INSERT ON reviews_title "
+    "BEGIN INSERT INTO reviews_title_fts(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER reviews_title_fts_ad AFTER DELETE ON reviews_title "
+    "BEGIN INSERT INTO reviews_title_fts(reviews_title_fts, rowid, name, "
+    "description) VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER reviews_title_fts_au AFTER UPDATE OF name, description "
+    "ON reviews_title "
+    "BEGIN INSERT INTO reviews_title_fts(reviews_title_fts, rowid, name, "
+    "description) VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO reviews_title_fts(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+    "INSERT INTO reviews_title_fts(reviews_title_fts) VALUES ('rebuild')",
+]
+DROP_INDEX = [
+    'DROP TABLE IF EXISTS reviews_title_fts',
+    'DROP TRIGGER IF EXISTS reviews_title_fts_ai',
+    'DROP TRIGGER IF EXISTS reviews_title_fts_ad',
+    'DROP TRIGGER IF EXISTS reviews_title_fts_au',
+]
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_INDEX:
+        schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_INDEX:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,67 @@
+from django.db import migrations
+
+CREATE_INDEX = [
+    "CREATE VIRTUAL TABLE reviews_review_fts USING fts5(text, "
+    "content='reviews_review', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER reviews_review_fts_ai AFTER INSERT ON reviews_review "
+    "BEGIN INSERT INTO reviews_review_fts(rowid, text) "
+    "VALUES (new.id, new.text); END",
+    "CREATE TRIGGER reviews_review_fts_ad AFTER DELETE ON reviews_review "
+    "BEGIN INSERT INTO reviews_review_fts(reviews_review_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER reviews_review_fts_au AFTER UPDATE OF text "
+    "ON reviews_review "
+    "BEGIN INSERT INTO reviews_review_fts(reviews_review_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO reviews_review_fts(rowid, text) "
+    "VALUES (new.id, new.text); END",
+    "INSERT INTO reviews_review_fts(reviews_review_fts) VALUES ('rebuild')",
+    "CREATE VIRTUAL TABLE reviews_comment_fts USING fts5(text, "
+    "content='reviews_comment', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER reviews_comment_fts_ai AFTER INSERT ON reviews_comment "
+    "BEGIN INSERT INTO reviews_comment_fts(rowid, text) "
+    "VALUES (new.id, new.text); END",
+    "CREATE TRIGGER reviews_comment_fts_ad AFTER DELETE ON reviews_comment "
+    "BEGIN INSERT INTO reviews_comment_fts(reviews_comment_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER reviews_comment_fts_au AFTER UPDATE OF text "
+    "ON reviews_comment "
+    "BEGIN INSERT INTO reviews_comment_fts(reviews_comment_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO reviews_comment_fts(rowid, text) "
+    "VALUES (new.id, new.text); END",
+    "INSERT INTO reviews_comment_fts(reviews_comment_fts) VALUES ('rebuild')",
+]
+DROP_INDEX = [
+    f'DROP {kind} IF EXISTS {table}_fts{suffix}'
+    for table in ('reviews_review', 'reviews_comment')
+    for kind, suffix in (('TABLE', ''), ('TRIGGER', '_ai'),
+                         ('TRIGGER', '_ad'), ('TRIGGER', '_au'))
+]
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_INDEX:
+        schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_INDEX:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_title_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_review_comment_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outgoingemail',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Занято отправителем до'),
+        ),
+    ]
@@ -5,7 +5,10 @@ from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import (MaxValueValidator, MinValueValidator,
                                     RegexValidator)
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (Count, F, FloatField, OuterRef, Subquery,
+                              Sum)
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
 
 
 class CustomUserManager(BaseUserManager):
@@ -103,6 +106,38 @@ class Genre(models.Model):
         return self.name
 
 
+class TitleQuerySet(models.QuerySet):
+    """Поддержка хранимого рейтинга произведений"""
+
+    @staticmethod
+    def rating_expression(rating_sum, rating_count):
+        return Round(
+            Cast(rating_sum, FloatField()) / NullIf(rating_count, 0))
+
+    def shift_rating(self, score_delta, count_delta):
+        """Инкрементально изменить сумму и число оценок одним UPDATE"""
+        rating_sum = F('rating_sum') + score_delta
+        rating_count = F('rating_count') + count_delta
+        return self.update(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            rating=self.rating_expression(rating_sum, rating_count)
+        )
+
+    def rebuild_rating(self):
+        """Пересчитать рейтинг по таблице отзывов с нуля"""
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')).order_by().values('title')
+        self.update(
+            rating_sum=Coalesce(Subquery(
+                reviews.annotate(total=Sum('score')).values('total')), 0),
+            rating_count=Coalesce(Subquery(
+                reviews.annotate(total=Count('id')).values('total')), 0),
+        )
+        return self.update(rating=self.rating_expression(
+            F('rating_sum'), F('rating_count')))
+
+
 class Title(models.Model):
     """Модель Произведения"""
     name = models.CharField(
@@ -120,6 +155,13 @@ class Title(models.Model):
     category = models.ForeignKey(
         Category, related_name='title', blank=True, null=True,
         on_delete=models.SET_NULL)
+    rating_sum = models.PositiveIntegerField(
+        verbose_name='Сумма оценок', default=0, editable=False)
+    rating_count = models.PositiveIntegerField(
+        verbose_name='Количество оценок', default=0, editable=False)
+    rating = models.PositiveSmallIntegerField(
+        verbose_name='Рейтинг', blank=True, null=True, editable=False)
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Произведение'
@@ -159,6 +201,10 @@ class Review(models.Model):
 
     class Meta:
         ordering = ['pub_date']
+        indexes = [
+            models.Index(fields=['title', 'pub_date', 'id'],
+                         name='review_title_pub_date_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['title', 'author'],
@@ -166,6 +212,11 @@ class Review(models.Model):
             )
         ]
 
+    def save(self, *args, **kwargs):
+        # reviews.signals блокирует строку до пересчёта рейтинга
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     review = models.ForeignKey(
@@ -184,3 +235,43 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['pub_date']
+        indexes = [
+            models.Index(fields=['review', 'pub_date', 'id'],
+                         name='comment_review_pub_date_idx'),
+        ]
+
+
+class DataVersion(models.Model):
+    """Версия области данных для ETag и ключей кэша ответов, см. api.cache"""
+    scope = models.CharField('Область', max_length=100, primary_key=True)
+    version = models.BigIntegerField('Версия', default=0)
+
+    class Meta:
+        verbose_name = 'Версия данных'
+        verbose_name_plural = 'Версии данных'
+
+    def __str__(self):
+        return f'{self.scope}: {self.version}'
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку, см. команду send_emails"""
+    subject = models.CharField('Тема', max_length=255)
+    message = models.TextField('Текст')
+    from_email = models.CharField('Отправитель', max_length=254)
+    recipient = models.EmailField('Получатель', max_length=254)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    sent = models.DateTimeField(
+        'Отправлено', blank=True, null=True, db_index=True)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    claimed_until = models.DateTimeField(
+        'Занято отправителем до', blank=True, null=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject}'
@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+MAX_ATTEMPTS = 5
+# Сколько письмо остаётся занятым отправителем, который не снял отметку
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def enqueue_email(subject, message, from_email, recipient_list):
+    """Поставить письма в очередь вместо отправки во время запроса"""
+    emails = [
+        OutgoingEmail.objects.create(
+            subject=subject, message=message,
+            from_email=from_email, recipient=recipient)
+        for recipient in recipient_list
+    ]
+    if getattr(settings, 'EMAIL_OUTBOX_EAGER', False):
+        ids = [email.pk for email in emails]
+        transaction.on_commit(lambda: send_outbox(ids=ids))
+    return emails
+
+
+def pending_emails(max_attempts=MAX_ATTEMPTS):
+    return OutgoingEmail.objects.filter(
+        sent__isnull=True, attempts__lt=max_attempts)
+
+
+def claim_emails(batch_size, max_attempts, ids=None):
+    """Занять пачку писем короткой транзакцией
+
+    Письмо занято до claimed_until, другие отправители его пропускают.
+    Если отправитель упал, не сняв отметку, письмо снова станет
+    доступно после CLAIM_TIMEOUT.
+    """
+    now = timezone.now()
+    claimed_until = now + CLAIM_TIMEOUT
+    with transaction.atomic():
+        emails = pending_emails(max_attempts).filter(
+            Q(claimed_until__isnull=True) | Q(claimed_until__lt=now)
+        ).select_for_update(skip_locked=True)
+        if ids is not None:
+            emails = emails.filter(pk__in=ids)
+        claimed = list(emails.values_list('pk', flat=True)[:batch_size])
+        if not claimed:
+            return []
+        OutgoingEmail.objects.filter(pk__in=claimed).update(
+            claimed_until=claimed_until)
+    return list(OutgoingEmail.objects.filter(
+        pk__in=claimed, claimed_until=claimed_until))
+
+
+def send_outbox(batch_size=100, max_attempts=MAX_ATTEMPTS, ids=None):
+    """Отправить пачку писем из очереди через одно соединение
+
+    Возвращает число отправленных и неотправленных писем. Письма
+    отправляются вне транзакции. Попыткой считается только ошибка
+    отправки конкретного письма, после max_attempts оно больше не
+    отправляется. Если не открылось соединение, ошибка записывается
+    письмам пачки, но попытка не засчитывается: при недоступном
+    SMTP-сервере письма ждут в очереди, а не исчерпывают попытки.
+    """
+    emails = claim_emails(batch_size, max_attempts, ids)
+    if not emails:
+        return 0, 0
+    sent = failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        for email in emails:
+            email.last_error = str(error) or repr(error)
+        failed = len(emails)
+    else:
+        try:
+            for email in emails:
+                try:
+                    EmailMessage(
+                        email.subject, email.message, email.from_email,
+                        [email.recipient], connection=connection
+                    ).send()
+                except Exception as error:
+                    email.attempts += 1
+                    email.last_error = str(error) or repr(error)
+                    failed += 1
+                else:
+                    email.sent = timezone.now()
+                    email.last_error = ''
+                    sent += 1
+        finally:
+            connection.close()
+    for email in emails:
+        email.claimed_until = None
+    OutgoingEmail.objects.bulk_update(
+        emails, ['sent', 'attempts', 'last_error', 'claimed_until'])
+    return sent, failed
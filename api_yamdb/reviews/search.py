@@ -0,0 +1,104 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Substr
+from django.utils.module_loading import import_string
+
+from .models import Comment, Review, Title
+
+# Поля моделей, по которым идёт полнотекстовый поиск
+SEARCH_FIELDS = {
+    Title: ('name', 'description'),
+    Review: ('text',),
+    Comment: ('text',),
+}
+SNIPPET_LENGTH = 200
+SNIPPET_WORDS = 24
+
+
+def index_table(model):
+    return f'{model._meta.db_table}_fts'
+
+
+def search_words(query):
+    return re.findall(r'\w+', query)
+
+
+class SearchBackend:
+    """Интерфейс полнотекстового поиска по моделям из SEARCH_FIELDS"""
+
+    def search(self, queryset, query):
+        """Отфильтровать queryset по query, лучшие совпадения первыми"""
+        raise NotImplementedError
+
+    def with_snippet(self, queryset, query):
+        """Добавить к найденным search объектам отрывок текста в snippet"""
+        raise NotImplementedError
+
+    def rebuild(self, model):
+        """Перестроить индекс модели с нуля"""
+
+
+class ContainsSearchBackend(SearchBackend):
+    """Поиск подстрокой для баз данных без полнотекстового индекса"""
+
+    def search(self, queryset, query):
+        condition = Q()
+        for word in search_words(query):
+            word_condition = Q()
+            for field in SEARCH_FIELDS[queryset.model]:
+                word_condition |= Q(**{f'{field}__icontains': word})
+            condition &= word_condition
+        return queryset.filter(condition)
+
+    def with_snippet(self, queryset, query):
+        field = SEARCH_FIELDS[queryset.model][0]
+        return queryset.annotate(snippet=Substr(field, 1, SNIPPET_LENGTH))
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    """Поиск по индексу FTS5, который поддерживают триггеры SQLite
+
+    Каждое слово запроса ищется как префикс, результаты упорядочены
+    по bm25 (rank).
+    """
+
+    def match_expression(self, query):
+        return ' '.join(f'"{word}"*' for word in search_words(query))
+
+    def search(self, queryset, query):
+        match = self.match_expression(query)
+        if not match:
+            return queryset.none()
+        fts = index_table(queryset.model)
+        table = queryset.model._meta.db_table
+        # Индекс присоединяется к таблице в том же запросе: MATCH
+        # выполняется один раз, а rank и snippet() берутся из его строк
+        return queryset.extra(
+            tables=[fts],
+            where=[f'{fts}.rowid = {table}.id', f'{fts} MATCH %s'],
+            params=[match],
+            order_by=[f'{fts}.rank', '-pk'],
+        )
+
+    def with_snippet(self, queryset, query):
+        fts = index_table(queryset.model)
+        return queryset.extra(select={
+            'snippet': f"snippet({fts}, 0, '', '', '…', {SNIPPET_WORDS})"})
+
+    def rebuild(self, model):
+        fts = index_table(model)
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def get_search_backend():
+    """Бэкенд из настройки SEARCH_BACKEND или подходящий для базы данных"""
+    path = getattr(settings, 'SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTS5Backend()
+    return ContainsSearchBackend()
@@ -0,0 +1,48 @@
+"""Хранимый рейтинг произведений следует за каждым изменением отзывов
+
+Обработчики срабатывают и при удалении каскадом: вместе с автором
+через DELETE /api/v1/users/{username}/, вместе с произведением и из
+админки. bulk_create и update() сигналов не отправляют, после них
+нужен Title.objects.rebuild_rating().
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Review, Title
+
+
+@receiver(pre_save, sender=Review)
+def remember_rated_values(sender, instance, **kwargs):
+    """Перечитать оценку из БД с блокировкой строки до конца транзакции
+
+    Review.save() выполняется в транзакции, поэтому параллельное
+    изменение того же отзыва ждёт и считает разницу от новой оценки.
+    """
+    instance._rated = None
+    if instance.pk is not None:
+        instance._rated = Review.objects.select_for_update().filter(
+            pk=instance.pk).values_list('title_id', 'score').first()
+
+
+@receiver(post_save, sender=Review)
+def shift_rating_on_save(sender, instance, created, **kwargs):
+    rated = getattr(instance, '_rated', None)
+    if rated is None:
+        Title.objects.filter(pk=instance.title_id).shift_rating(
+            instance.score, 1)
+        return
+    title_id, score = rated
+    if title_id == instance.title_id:
+        if score != instance.score:
+            Title.objects.filter(pk=title_id).shift_rating(
+                instance.score - score, 0)
+        return
+    Title.objects.filter(pk=title_id).shift_rating(-score, -1)
+    Title.objects.filter(pk=instance.title_id).shift_rating(
+        instance.score, 1)
+
+
+@receiver(post_delete, sender=Review)
+def shift_rating_on_delete(sender, instance, **kwargs):
+    Title.objects.filter(pk=instance.title_id).shift_rating(
+        -instance.score, -1)
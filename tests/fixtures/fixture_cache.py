@@ -0,0 +1,17 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    from django.core.cache import caches
+
+    from api.authentication import user_states
+    from api.autocomplete import category_index, genre_index
+    from api.metrics import metrics_store
+
+    for cache in caches.all():
+        cache.clear()
+    user_states.clear()
+    category_index.invalidate()
+    genre_index.invalidate()
+    metrics_store.reset()
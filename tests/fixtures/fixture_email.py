@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def eager_email_outbox(settings):
+    # тесты регистрации ждут письмо сразу после запроса
+    settings.EMAIL_OUTBOX_EAGER = True
@@ -0,0 +1,1138 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from .common import (auth_client, create_categories, create_comments,
+                     create_genre, create_reviews, create_titles)
+
+
+class Test08TitleRating:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_rating_is_stored(self, admin_client, admin):
+        from reviews.models import Title
+
+        reviews, titles, user, moderator = create_reviews(admin_client, admin)
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.rating_sum, title.rating_count, title.rating) == (12, 3, 4), (
+            'Проверьте, что при создании отзыва обновляются сумма, количество оценок и рейтинг произведения'
+        )
+
+        auth_client(user).patch(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[1]["id"]}/', data={'score': 10})
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count, title.rating) == (19, 3, 6), (
+            'Проверьте, что при изменении оценки в отзыве пересчитывается рейтинг произведения'
+        )
+
+        admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/')
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count, title.rating) == (14, 2, 7), (
+            'Проверьте, что при удалении отзыва пересчитывается рейтинг произведения'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_rebuild_ratings(self, admin_client, admin):
+        from reviews.models import Title
+
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        Title.objects.update(rating_sum=0, rating_count=0, rating=None)
+        call_command('rebuild_ratings', stdout=StringIO())
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.rating_sum, title.rating_count, title.rating) == (12, 3, 4), (
+            'Проверьте, что команда `rebuild_ratings` пересчитывает рейтинг по отзывам'
+        )
+        title = Title.objects.get(pk=titles[1]['id'])
+        assert (title.rating_sum, title.rating_count, title.rating) == (0, 0, None), (
+            'Проверьте, что у произведения без отзывов рейтинг равен `None`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_rating_follows_cascades_and_direct_saves(self, admin_client, admin):
+        from django.db.models import Count, Sum
+
+        from reviews.models import Review, Title
+
+        def assert_consistent(message):
+            for title in Title.objects.annotate(total=Sum('reviews__score'), number=Count('reviews')):
+                assert (title.rating_sum, title.rating_count) == (title.total or 0, title.number), message
+
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        review = Review.objects.get(pk=reviews[0]['id'])
+        review.score = 1
+        review.save()
+        assert_consistent('Проверьте, что рейтинг меняется при сохранении отзыва в обход API')
+        review.title_id = titles[1]['id']
+        review.save()
+        assert_consistent('Проверьте, что перенос отзыва в другое произведение меняет рейтинг обоих')
+
+        assert Review.objects.filter(author=user).exists()
+        response = admin_client.delete(f'/api/v1/users/{user.username}/')
+        assert response.status_code == 204
+        assert not Review.objects.filter(author_id=user.id).exists()
+        assert_consistent(
+            'Проверьте, что отзывы, удалённые вместе с пользователем, убираются из рейтинга произведений'
+        )
+
+
+class Test08TitleQueries:
+
+    @staticmethod
+    def create_many_titles(admin_client, count):
+        genres = create_genre(admin_client)
+        categories = create_categories(admin_client)
+        for i in range(count):
+            data = {'name': f'Произведение {i}', 'year': 2000,
+                    'genre': [genre['slug'] for genre in genres],
+                    'category': categories[i % 2]['slug']}
+            admin_client.post('/api/v1/titles/', data=data)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_title_list_queries(self, client, admin_client, django_assert_num_queries):
+        create_titles(admin_client)
+        with django_assert_num_queries(4):
+            response = client.get('/api/v1/titles/')
+        assert len(response.json()['results']) == 2
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_title_list_queries_full_page(self, client, admin_client, django_assert_num_queries):
+        self.create_many_titles(admin_client, 5)
+        with django_assert_num_queries(4):
+            response = client.get('/api/v1/titles/')
+        assert len(response.json()['results']) == 5, (
+            'Проверьте, что число запросов к БД для страницы `/api/v1/titles/` не зависит от размера страницы'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_title_detail_queries(self, client, admin_client, django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        with django_assert_num_queries(3):
+            response = client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert response.status_code == 200
+        assert len(response.json()['genre']) == 2
+
+
+class Test08CursorPagination:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_review_cursor_pagination(self, client, admin_client, admin):
+        from reviews.models import Review, Title, User
+
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        title = Title.objects.get(pk=titles[0]['id'])
+        for i in range(4):
+            author = User.objects.create_user(
+                username=f'cursor_user_{i}', email=f'cursor_{i}@yamdb.fake')
+            Review.objects.create(title=title, author=author, text=f'text {i}', score=5)
+
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        response = client.get(url, {'pagination': 'cursor'})
+        assert response.status_code == 200
+        data = response.json()
+        assert 'count' not in data and data['next'] and data['previous'] is None, (
+            'Проверьте, что при `?pagination=cursor` возвращается курсорная пагинация'
+        )
+        ids = [review['id'] for review in data['results']]
+        data = client.get(data['next']).json()
+        ids += [review['id'] for review in data['results']]
+        assert data['next'] is None and data['previous'], (
+            'Проверьте, что ссылки курсорной пагинации ведут на соседние страницы'
+        )
+        expected = list(Review.objects.filter(title=title).order_by('pub_date', 'id').values_list('id', flat=True))
+        assert ids == expected, (
+            'Проверьте, что курсорная пагинация возвращает все отзывы по порядку публикации'
+        )
+
+        data = client.get(url).json()
+        assert data['count'] == 7, (
+            'Проверьте, что без параметра `pagination` используется постраничная пагинация'
+        )
+
+
+class Test08CsvImport:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_load_csv_data(self):
+        from reviews.models import Comment, Review, Title, TitleGenre, User
+
+        call_command('load_csv_data', stdout=StringIO())
+        assert User.objects.count() > 0 and TitleGenre.objects.count() > 0, (
+            'Проверьте, что команда `load_csv_data` загружает все CSV-файлы'
+        )
+        assert Comment.objects.count() > 0 and Review.objects.count() > 0
+        review = Review.objects.get(pk=1)
+        assert review.pub_date.year == 2019, (
+            'Проверьте, что команда `load_csv_data` сохраняет дату публикации из CSV'
+        )
+        title = Title.objects.get(pk=review.title_id)
+        assert title.rating_count == title.reviews.count(), (
+            'Проверьте, что после загрузки CSV пересчитывается рейтинг произведений'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_load_csv_data_skips_orphans(self, tmp_path):
+        import shutil
+
+        from reviews.management.commands.load_csv_data import DATA_DIR
+        from reviews.models import Comment, Review
+
+        shutil.copytree(DATA_DIR, tmp_path / 'data')
+        with open(tmp_path / 'data' / 'review.csv', 'a', encoding='utf-8') as csv_file:
+            csv_file.write('\n9001,99999,Отзыв без произведения,100,5,2020-01-01T00:00:00Z\n')
+        with open(tmp_path / 'data' / 'comments.csv', 'a', encoding='utf-8') as csv_file:
+            csv_file.write('\n9001,9001,Комментарий к пропущенному отзыву,100,2020-01-01T00:00:00Z\n')
+
+        out = StringIO()
+        call_command('load_csv_data', path=str(tmp_path / 'data'), batch_size=7, stdout=out)
+        assert not Review.objects.filter(pk=9001).exists() and not Comment.objects.filter(pk=9001).exists(), (
+            'Проверьте, что команда `load_csv_data` пропускает строки со ссылками на отсутствующие записи'
+        )
+        assert 'пропущено 1' in out.getvalue()
+        assert Review.objects.count() > 7, (
+            'Проверьте, что команда `load_csv_data` загружает файл несколькими пачками `--batch-size`'
+        )
+
+    def test_03_id_set_large_ids(self):
+        from reviews.management.commands.load_csv_data import IdSet
+
+        ids = IdSet()
+        for value in (0, 7, 8, 1000, IdSet.BITMAP_LIMIT, 9_876_543_210):
+            ids.add(value)
+        assert len(ids.bits) <= IdSet.BITMAP_LIMIT // 8, (
+            'Проверьте, что большие id не раздувают битовую карту'
+        )
+        assert all(value in ids for value in (0, 7, 8, 1000, 9_876_543_210))
+        assert 1 not in ids and 9_876_543_211 not in ids and -1 not in ids
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_load_csv_data_parallel(self):
+        from reviews.models import Comment, Review, TitleGenre, User
+
+        call_command('load_csv_data', workers=3, batch_size=10, stdout=StringIO())
+        counts = [model.objects.count() for model in (User, TitleGenre, Review, Comment)]
+        assert all(counts), (
+            'Проверьте, что команда `load_csv_data --workers` загружает все CSV-файлы'
+        )
+
+    def test_05_topological_order(self):
+        from reviews.management.commands.load_csv_data import TABLES, topological_order
+
+        order = [table.model for table in topological_order(reversed(TABLES))]
+        for table in TABLES:
+            for parent in table.references.values():
+                assert order.index(parent) < order.index(table.model), (
+                    'Проверьте, что родительские таблицы загружаются раньше дочерних'
+                )
+
+
+class Test08TokenAuthentication:
+
+    @staticmethod
+    def token_client(user):
+        from rest_framework.test import APIClient
+
+        from api.authentication import get_access_token
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {get_access_token(user)}')
+        return client
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_no_user_query(self, client, admin_client, admin):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        _, titles, _, moderator = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        moderator_client = self.token_client(moderator)
+        moderator_client.get(url)
+        with CaptureQueriesContext(connection) as anonymous:
+            client.get(url)
+        with CaptureQueriesContext(connection) as authenticated:
+            response = moderator_client.get(url)
+        assert response.status_code == 200
+        assert len(authenticated) == len(anonymous), (
+            'Проверьте, что аутентификация по токену не загружает пользователя из БД на каждый запрос'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_role_change_revokes_token(self, admin):
+        admin_client = self.token_client(admin)
+        assert admin_client.get('/api/v1/users/').status_code == 200
+        admin.role = 'user'
+        admin.save()
+        response = admin_client.get('/api/v1/users/')
+        assert response.status_code == 401, (
+            'Проверьте, что токен с устаревшей ролью пользователя перестаёт приниматься'
+        )
+
+
+class Test08EmailOutbox:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_signup_email_is_queued(self, client, settings):
+        from django.core import mail
+
+        from reviews.models import OutgoingEmail
+
+        settings.EMAIL_OUTBOX_EAGER = False
+        outbox_before_count = len(mail.outbox)
+        data = {'email': 'queued@yamdb.fake', 'username': 'queued_user'}
+        response = client.post('/api/v1/auth/signup/', data=data)
+        assert response.status_code == 200
+        assert len(mail.outbox) == outbox_before_count, (
+            'Проверьте, что при регистрации письмо ставится в очередь, а не отправляется во время запроса'
+        )
+        assert OutgoingEmail.objects.filter(recipient=data['email'], sent__isnull=True).exists()
+
+        call_command('send_emails', stdout=StringIO())
+        assert len(mail.outbox) == outbox_before_count + 1, (
+            'Проверьте, что команда `send_emails` отправляет письма из очереди'
+        )
+        assert data['email'] in mail.outbox[-1].to
+        assert not OutgoingEmail.objects.filter(sent__isnull=True).exists(), (
+            'Проверьте, что отправленные письма помечаются в очереди'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_smtp_outage(self, client, settings, monkeypatch):
+        from django.core.mail.backends.locmem import EmailBackend
+
+        from reviews.models import OutgoingEmail
+
+        def refuse(self):
+            raise ConnectionRefusedError('Connection refused')
+
+        monkeypatch.setattr(EmailBackend, 'open', refuse, raising=False)
+        settings.EMAIL_OUTBOX_EAGER = True
+        data = {'email': 'outage@yamdb.fake', 'username': 'outage_user'}
+        response = client.post('/api/v1/auth/signup/', data=data)
+        assert response.status_code == 200, (
+            'Проверьте, что недоступный SMTP-сервер не ломает регистрацию'
+        )
+        email = OutgoingEmail.objects.get(recipient=data['email'])
+        assert email.sent is None and email.attempts == 0 and 'refused' in email.last_error, (
+            'Проверьте, что ошибка соединения записывается в письмо, но не засчитывается как попытка'
+        )
+        assert email.claimed_until is None
+
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 8:
+                raise KeyboardInterrupt
+
+        monkeypatch.setattr('time.sleep', sleep)
+        with pytest.raises(KeyboardInterrupt):
+            call_command('send_emails', loop=True, interval=1, stdout=StringIO())
+        assert sleeps == [2, 4, 8, 16, 32, 60, 60, 60], (
+            'Проверьте, что `send_emails --loop` при недоступном SMTP увеличивает паузу, а не завершается'
+        )
+        email.refresh_from_db()
+        assert email.attempts == 0 and email.claimed_until is None, (
+            'Проверьте, что долгий отказ SMTP не исчерпывает попытки отправки писем'
+        )
+
+        monkeypatch.undo()
+        monkeypatch.setattr('django.core.mail.EmailMessage.send', lambda self: 1 / 0)
+        call_command('send_emails', stdout=StringIO())
+        email.refresh_from_db()
+        assert email.attempts == 1 and email.sent is None, (
+            'Проверьте, что ошибка отправки письма засчитывается как попытка'
+        )
+        monkeypatch.undo()
+        call_command('send_emails', stdout=StringIO())
+        email.refresh_from_db()
+        assert email.sent is not None
+
+
+class Test08ResponseCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_anonymous_list_cache(self, client, admin_client):
+        from api.metrics import metrics_store
+
+        def cache_stats():
+            return metrics_store.collect()['cache']
+
+        titles, _, _ = create_titles(admin_client)
+        response = client.get('/api/v1/genres/', {'search': 'а', 'page': 1})
+        assert response['X-Cache'] == 'MISS'
+        genres_count = response.json()['count']
+        response = client.get('/api/v1/genres/', {'page': 1, 'search': 'а'})
+        assert response['X-Cache'] == 'HIT', (
+            'Проверьте, что повторный анонимный запрос списка берётся из кэша '
+            'независимо от порядка параметров'
+        )
+        assert cache_stats() == {'hits': 1, 'misses': 1}
+
+        admin_client.get('/api/v1/genres/')
+        assert cache_stats() == {'hits': 1, 'misses': 1}, (
+            'Проверьте, что ответы для аутентифицированных пользователей не кэшируются'
+        )
+
+        client.get('/api/v1/titles/')
+        admin_client.post('/api/v1/genres/', data={'name': 'Ужасное', 'slug': 'awful'})
+        response = client.get('/api/v1/genres/', {'page': 1, 'search': 'а'})
+        assert response['X-Cache'] == 'MISS' and response.json()['count'] == genres_count + 1, (
+            'Проверьте, что изменение жанров сбрасывает кэш списка жанров'
+        )
+        response = client.get('/api/v1/titles/')
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что изменение жанров сбрасывает кэш списка произведений'
+        )
+
+        client.get('/api/v1/titles/')
+        admin_client.patch(f'/api/v1/titles/{titles[0]["id"]}/', data={'name': 'Новое имя'})
+        response = client.get('/api/v1/titles/')
+        assert response['X-Cache'] == 'MISS' and response.json()['results'][-1]['name'] == 'Новое имя', (
+            'Проверьте, что изменение произведения сбрасывает кэш списка произведений'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_cache_key_includes_host(self, client):
+        from reviews.models import Title
+
+        Title.objects.bulk_create(Title(name=f'Произведение {i}', year=2000) for i in range(6))
+        response = client.get('/api/v1/titles/', HTTP_HOST='internal:8000')
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['next'].startswith('http://internal:8000/')
+        response = client.get('/api/v1/titles/', HTTP_HOST='api.example.com', secure=True)
+        assert response['X-Cache'] == 'MISS' and response.json()['next'].startswith('https://api.example.com/'), (
+            'Проверьте, что ответы с абсолютными ссылками кэшируются отдельно для каждой схемы и хоста'
+        )
+        assert client.get('/api/v1/titles/', HTTP_HOST='api.example.com', secure=True)['X-Cache'] == 'HIT'
+
+
+class Test08ConditionalGet:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_review_list_etag(self, client, admin_client, admin, django_assert_num_queries):
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = client.get(url)
+        etag = response['ETag']
+        assert response.status_code == 200 and etag, (
+            'Проверьте, что ответ со списком отзывов содержит заголовок `ETag`'
+        )
+        with django_assert_num_queries(1):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            'Проверьте, что при совпадении `If-None-Match` возвращается статус 304 после одного запроса версий'
+        )
+
+        other_url = f'/api/v1/titles/{titles[1]["id"]}/reviews/'
+        other_etag = client.get(other_url)['ETag']
+        auth_client(user).patch(f'{url}{reviews[1]["id"]}/', data={'text': 'Новый текст'})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200 and response['ETag'] != etag, (
+            'Проверьте, что изменение отзыва меняет `ETag` списка отзывов'
+        )
+        assert client.get(other_url, HTTP_IF_NONE_MATCH=other_etag).status_code == 304, (
+            'Проверьте, что изменение отзыва не сбрасывает `ETag` отзывов других произведений'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_title_detail_etag(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        etag = client.get(url)['ETag']
+        assert client.get(url, HTTP_IF_NONE_MATCH=f'W/{etag}').status_code == 304
+        admin_client.patch(f'/api/v1/titles/{titles[1]["id"]}/', data={'name': 'Другое'})
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304, (
+            'Проверьте, что изменение другого произведения не меняет `ETag` произведения'
+        )
+        admin_client.patch(url, data={'name': 'Новое имя'})
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200, (
+            'Проверьте, что изменение произведения меняет его `ETag`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_versions_shared_between_processes(self, client, admin_client):
+        from django.core.cache import caches
+
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        etag = client.get(url)['ETag']
+        assert client.get('/api/v1/titles/')['X-Cache'] == 'MISS'
+        # память другого процесса не видит записи в этом процессе
+        cache = caches['default']
+        memory = dict(cache._cache), dict(cache._expire_info)
+        admin_client.patch(url, data={'name': 'Новое имя'})
+        cache._cache.clear()
+        cache._cache.update(memory[0])
+        cache._expire_info.clear()
+        cache._expire_info.update(memory[1])
+
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200, (
+            'Проверьте, что версии для `ETag` хранятся в БД, а не в памяти процесса'
+        )
+        response = client.get('/api/v1/titles/')
+        assert response['X-Cache'] == 'MISS' and response.json()['results'][-1]['name'] == 'Новое имя', (
+            'Проверьте, что кэш ответов в памяти процесса сбрасывается записью из другого процесса'
+        )
+
+
+class Test08TitleSearch:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_title_search(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+
+        def search(query):
+            response = client.get('/api/v1/titles/', {'search': query})
+            assert response.status_code == 200
+            return [title['id'] for title in response.json()['results']]
+
+        assert search('пово') == [titles[0]['id']], (
+            'Проверьте, что фильтр `search` находит произведения по началу слова в названии'
+        )
+        assert search('ДРАМА года') == [titles[1]['id']], (
+            'Проверьте, что фильтр `search` ищет по описанию без учёта регистра'
+        )
+        assert search('драма пике') == [], (
+            'Проверьте, что фильтр `search` требует совпадения всех слов запроса'
+        )
+        assert search('"*') == [], (
+            'Проверьте, что фильтр `search` не падает на служебных символах'
+        )
+
+        admin_client.patch(f'/api/v1/titles/{titles[1]["id"]}/', data={'name': 'Поворот обратно'})
+        assert sorted(search('поворот')) == [titles[0]['id'], titles[1]['id']], (
+            'Проверьте, что поисковый индекс обновляется при изменении произведения'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_review_and_comment_search(self, client, admin_client, admin):
+        from reviews.models import Review
+
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        Review.objects.filter(pk=reviews[1]['id']).update(text='Смотрел дважды, финал поразил')
+
+        response = client.get('/api/v1/search/reviews/', {'q': 'ФИНАЛ'})
+        assert response.status_code == 200
+        data = response.json()
+        assert data['count'] == 1, (
+            'Проверьте, что `/api/v1/search/reviews/` находит отзывы по тексту'
+        )
+        hit = data['results'][0]
+        assert hit['id'] == reviews[1]['id'] and hit['title'] == titles[0]['id'], (
+            'Проверьте, что результат поиска отзывов содержит id отзыва и произведения'
+        )
+        assert 'финал' in hit['snippet']
+
+        response = client.get('/api/v1/search/comments/', {'q': 'qwerty12'})
+        data = response.json()
+        assert data['count'] == 1 and data['results'][0]['id'] == comments[1]['id'], (
+            'Проверьте, что `/api/v1/search/comments/` находит комментарии по тексту'
+        )
+        assert data['results'][0]['title'] == titles[0]['id']
+        assert data['results'][0]['review'] == reviews[0]['id']
+
+        assert client.get('/api/v1/search/reviews/').status_code == 400, (
+            'Проверьте, что поиск без параметра `q` возвращает статус 400'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_rebuild_search_index(self, admin_client):
+        from django.db import connection
+
+        titles, _, _ = create_titles(admin_client)
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO reviews_title_fts(reviews_title_fts) VALUES ('delete-all')")
+        assert admin_client.get('/api/v1/titles/', {'search': 'проект'}).json()['count'] == 0
+        call_command('rebuild_search_index', stdout=StringIO())
+        assert admin_client.get('/api/v1/titles/', {'search': 'проект'}).json()['count'] == 1, (
+            'Проверьте, что команда `rebuild_search_index` перестраивает поисковый индекс'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_match_runs_once(self, client, admin_client, admin):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from reviews.models import Review
+
+        reviews, _, _, _ = create_reviews(admin_client, admin)
+        Review.objects.filter(pk__in=[review['id'] for review in reviews]).update(text='Финал поразил')
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get('/api/v1/search/reviews/', {'q': 'финал'})
+        assert response.status_code == 200 and response.json()['results']
+        page_query = captured[-1]['sql']
+        assert page_query.count('MATCH') == 1 and 'snippet(' in page_query, (
+            'Проверьте, что поиск присоединяет индекс FTS5 к таблице и берёт rank и snippet '
+            'из одного MATCH, а не из подзапроса на каждую строку'
+        )
+
+
+class Test08Autocomplete:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_autocomplete(self, client, admin_client, django_assert_num_queries):
+        create_titles(admin_client)
+        admin_client.post('/api/v1/genres/', data={'name': 'Комиксы', 'slug': 'comics'})
+        url = '/api/v1/genres/autocomplete/'
+
+        response = client.get(url, {'q': 'COM'})
+        assert response.status_code == 200
+        assert [genre['slug'] for genre in response.json()] == ['comedy', 'comics'], (
+            'Проверьте, что `/api/v1/genres/autocomplete/` ищет по началу слага '
+            'и ставит выше жанры с большим числом произведений'
+        )
+        with django_assert_num_queries(0):
+            client.get(url, {'q': 'ком'})
+        assert client.get(url, {'q': 'ком', 'limit': 1}).json() == [
+            {'name': 'Комедия', 'slug': 'comedy'}
+        ]
+
+        for year in (2001, 2002):
+            admin_client.post('/api/v1/titles/', data={
+                'name': f'Выпуск {year}', 'year': year, 'genre': ['comics'], 'category': 'books'
+            })
+        assert [genre['slug'] for genre in client.get(url, {'q': 'com'}).json()] == ['comics', 'comedy'], (
+            'Проверьте, что индекс автодополнения перестраивается после изменения произведений'
+        )
+
+        response = client.get('/api/v1/categories/autocomplete/', {'q': 'кн'})
+        assert response.json() == [{'name': 'Книги', 'slug': 'books'}], (
+            'Проверьте, что `/api/v1/categories/autocomplete/` ищет по началу названия'
+        )
+        assert client.get(url).json() == []
+
+
+class Test08Benchmark:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_benchmark_covers_routes(self):
+        from api.benchmark import Benchmark, api_routes, compare, populate
+
+        populate(20)
+        benchmark = Benchmark(repeat=2)
+        assert api_routes() <= {case.route for case in benchmark.get_cases()}, (
+            'Проверьте, что в замерах есть сценарий для каждого маршрута API'
+        )
+        results = benchmark.run(only='titles')
+        assert results['titles list']['queries'] == 4
+        assert results['titles list anonymous']['queries'] == 1
+        assert compare(results, results, tolerance=0) == []
+
+        baseline = {'titles list': dict(results['titles list'], queries=2)}
+        assert compare(results, baseline, tolerance=0) == [
+            'titles list: запросов 4, было 2'
+        ], 'Проверьте, что рост числа запросов считается регрессией'
+
+    def test_02_missing_baseline_fails(self, tmp_path):
+        from django.core.management import CommandError
+
+        with pytest.raises(CommandError, match='--save-baseline'):
+            call_command('benchmark', baseline=str(tmp_path / 'missing.json'), stdout=StringIO())
+
+
+class Test08Dataset:
+    sizes = {'users': 30, 'titles': 40, 'reviews': 300, 'comments': 200, 'seed': 7}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_generate_csv(self, tmp_path):
+        from reviews.models import Comment, Review, Title
+
+        call_command('generate_dataset', output=str(tmp_path), stdout=StringIO(), **self.sizes)
+        call_command('load_csv_data', path=str(tmp_path), stdout=StringIO())
+        assert Title.objects.count() == 40
+        assert Review.objects.count() > 200 and Comment.objects.count() > 150, (
+            'Проверьте, что `generate_dataset --output` пишет CSV в формате `load_csv_data`'
+        )
+        counts = sorted(Title.objects.values_list('rating_count', flat=True), reverse=True)
+        assert counts[0] >= 5 * counts[len(counts) // 2], (
+            'Проверьте, что популярность произведений распределена неравномерно'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_generate_database(self, tmp_path):
+        from reviews.models import Comment, Review, User
+
+        call_command('generate_dataset', output=str(tmp_path), stdout=StringIO(), **self.sizes)
+        call_command('generate_dataset', stdout=StringIO(), **self.sizes)
+        with open(tmp_path / 'review.csv', encoding='utf-8') as csv_file:
+            assert Review.objects.count() == sum(1 for _ in csv_file) - 1, (
+                'Проверьте, что при одинаковом `--seed` данные в БД и в CSV совпадают'
+            )
+        assert User.objects.count() == 30 and Comment.objects.exists()
+        User.objects.create(username='new', email='new@yamdb.fake')
+
+
+class Test08Profiling:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_serializers_unpatched_until_profiled(self, admin_client, settings, monkeypatch):
+        from rest_framework.serializers import BaseSerializer
+
+        data = BaseSerializer.data
+        monkeypatch.setattr(BaseSerializer, 'data', getattr(data.fget, 'original', data))
+        settings.API_PROFILING = False
+        settings.API_PROFILING_HEADER = True
+        admin_client.get('/api/v1/users/')
+        assert not getattr(BaseSerializer.data.fget, 'profiled', False), (
+            'Проверьте, что без профилирования `BaseSerializer.data` не подменяется'
+        )
+        response = admin_client.get('/api/v1/users/', HTTP_X_PROFILE='1')
+        assert getattr(BaseSerializer.data.fget, 'profiled', False)
+        assert 'serialize;dur=' in response['Server-Timing']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_server_timing(self, admin_client, settings):
+        create_titles(admin_client)
+        settings.API_PROFILING = False
+        settings.API_PROFILING_HEADER = False
+        assert 'Server-Timing' not in admin_client.get('/api/v1/titles/', HTTP_X_PROFILE='1'), (
+            'Проверьте, что профилирование выключено по умолчанию'
+        )
+
+        settings.API_PROFILING_HEADER = True
+        assert 'Server-Timing' not in admin_client.get('/api/v1/titles/')
+        response = admin_client.get('/api/v1/titles/', HTTP_X_PROFILE='1')
+        timing = response['Server-Timing']
+        metrics = {part.split(';')[0] for part in timing.split(', ')}
+        assert metrics == {'total', 'sql', 'serialize', 'render'}, (
+            'Проверьте, что заголовок `Server-Timing` содержит общее время, время SQL, '
+            'сериализации и отрисовки'
+        )
+        assert 'desc="4 queries (0 duplicate)"' in timing
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_reader_time_is_serialize(self, admin_client, settings, monkeypatch):
+        import re
+        import time
+
+        from api.readers import TitleReader
+
+        titles, _, _ = create_titles(admin_client)
+        read = TitleReader.read
+
+        def slow_read(reader, rows):
+            time.sleep(0.05)
+            return read(reader, rows)
+
+        monkeypatch.setattr(TitleReader, 'read', slow_read)
+        settings.API_PROFILING = True
+        for url in ('/api/v1/titles/', f'/api/v1/titles/{titles[0]["id"]}/'):
+            timing = admin_client.get(url)['Server-Timing']
+            serialize = float(re.search(r'serialize;dur=([\d.]+)', timing).group(1))
+            assert serialize >= 50, (
+                'Проверьте, что время читателя учитывается в метрике `serialize`'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_cprofile_dump(self, client, settings, tmp_path):
+        settings.API_PROFILING = True
+        settings.API_PROFILING_DIR = str(tmp_path)
+        settings.API_PROFILING_SAMPLE_RATE = 1
+        response = client.get('/api/v1/genres/')
+        assert 'Server-Timing' in response
+        dumps = list(tmp_path.glob('*-GET-api-v1-genres.prof'))
+        assert len(dumps) == 1, (
+            'Проверьте, что выбранные запросы сохраняются в каталог `API_PROFILING_DIR`'
+        )
+
+
+class Test08Metrics:
+
+    @staticmethod
+    def samples(client):
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+        return dict(
+            line.rsplit(' ', 1) for line in response.content.decode().splitlines()
+            if not line.startswith('#')
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_metrics(self, client, admin_client, settings):
+        settings.EMAIL_OUTBOX_EAGER = False
+        create_titles(admin_client)
+        client.get('/api/v1/titles/')
+        client.get('/api/v1/titles/')
+        client.post('/api/v1/auth/signup/', data={'username': 'metrics', 'email': 'metrics@yamdb.fake'})
+
+        samples = self.samples(client)
+        assert samples['api_requests_total{route="titles-list",method="GET",status="200"}'] == '2', (
+            'Проверьте, что `/metrics` считает запросы по именам маршрутов'
+        )
+        assert samples['api_request_duration_seconds_count{route="titles-list"}'] == '4'
+        assert samples['api_request_duration_seconds_bucket{route="titles-list",le="+Inf"}'] == '4'
+        assert int(samples['api_db_queries_total{route="get_code"}']) > 0
+        assert samples['api_response_cache_requests_total{result="hit"}'] == '1'
+        assert samples['api_response_cache_hit_ratio'] == '0.5'
+        assert samples['api_email_outbox_pending'] == '1', (
+            'Проверьте, что `/metrics` показывает число писем в очереди'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_metrics_from_workers(self, client, settings, tmp_path):
+        import json
+
+        settings.METRICS_DIR = str(tmp_path)
+        (tmp_path / '1.json').write_text(json.dumps({
+            'requests': {'genres-list GET 200': 4},
+            'queries': {'genres-list': 8},
+            'cache': {'hits': 3},
+            'durations': {'genres-list': [4] + [0] * 10 + [0.01]},
+        }))
+        client.get('/api/v1/genres/')
+        samples = self.samples(client)
+        assert samples['api_requests_total{route="genres-list",method="GET",status="200"}'] == '5', (
+            'Проверьте, что `/metrics` складывает счётчики всех процессов из `METRICS_DIR`'
+        )
+        assert samples['api_request_duration_seconds_count{route="genres-list"}'] == '5'
+        assert samples['api_response_cache_requests_total{result="hit"}'] == '3'
+        assert samples['api_response_cache_requests_total{result="miss"}'] == '1'
+        assert samples['api_response_cache_hit_ratio'] == '0.75', (
+            'Проверьте, что `/metrics` складывает обращения к кэшу ответов всех процессов'
+        )
+
+
+class Test08FastJSON:
+
+    def test_01_renderer_matches_drf(self):
+        import datetime
+        import decimal
+        import uuid
+
+        from django.http import QueryDict
+        from django.utils.translation import gettext_lazy
+        from rest_framework.renderers import JSONRenderer
+
+        from api.renderers import FastJSONRenderer
+
+        data = {
+            'name': 'Поворот туда ', 'genre': [{'name': 'Драма', 'slug': 'drama'}],
+            'rating': None, 'year': 2000, 'ok': True, 1: 'ключ-число',
+            'pub_date': datetime.datetime(2020, 1, 13, 23, 20, 2, 422123, tzinfo=datetime.timezone.utc),
+            'day': datetime.date(2020, 1, 13), 'price': decimal.Decimal('1.50'),
+            'id': uuid.UUID(int=1), 'lazy': gettext_lazy('Текст'), 'big': 2 ** 70,
+        }
+        for media_type in (None, 'application/json; indent=4'):
+            assert FastJSONRenderer().render(data, media_type) == JSONRenderer().render(data, media_type), (
+                'Проверьте, что `FastJSONRenderer` отдаёт те же байты, что и `JSONRenderer`'
+            )
+        assert FastJSONRenderer().render(None) == b''
+        query = QueryDict('username=a&username=b&email=c')
+        assert FastJSONRenderer().render(query) == JSONRenderer().render(query)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_parser(self, admin_client):
+        response = admin_client.post(
+            '/api/v1/genres/', data='{"name": "Нуар", "slug": "noir"}', content_type='application/json'
+        )
+        assert response.status_code == 201
+        response = admin_client.post('/api/v1/genres/', data='{"name": NaN}', content_type='application/json')
+        assert response.status_code == 400 and 'JSON parse error' in response.json()['detail'], (
+            'Проверьте, что некорректный JSON возвращает статус 400'
+        )
+
+
+class Test08ValuesRead:
+
+    @staticmethod
+    def serialized(serializer_class, queryset):
+        import json
+
+        from rest_framework.renderers import JSONRenderer
+
+        return json.loads(JSONRenderer().render(serializer_class(queryset, many=True).data))
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_same_output_as_serializers(self, admin_client, admin):
+        from api.serializers import CommentSerializer, ReviewSerializer, TitleSerializer
+        from api.views import TitleViewSet
+        from reviews.models import Comment, Review, Title
+
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        Title.objects.filter(pk=titles[1]['id']).update(category=None, description=None)
+        expected = self.serialized(TitleSerializer, TitleViewSet.queryset)
+
+        response = admin_client.get('/api/v1/titles/')
+        assert response.json()['results'] == expected, (
+            'Проверьте, что быстрый список произведений совпадает с выводом `TitleSerializer`'
+        )
+        response = admin_client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert response.json() == expected[-1]
+
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        expected = self.serialized(ReviewSerializer, Review.objects.filter(title_id=titles[0]['id']))
+        assert admin_client.get(url).json()['results'] == expected, (
+            'Проверьте, что быстрый список отзывов совпадает с выводом `ReviewSerializer`'
+        )
+        assert admin_client.get(url, {'pagination': 'cursor'}).json()['results'] == expected
+        assert admin_client.get(f'{url}{reviews[0]["id"]}/').json() == expected[0]
+
+        url = f'{url}{reviews[0]["id"]}/comments/'
+        expected = self.serialized(CommentSerializer, Comment.objects.filter(review_id=reviews[0]['id']))
+        assert admin_client.get(url).json()['results'] == expected, (
+            'Проверьте, что быстрый список комментариев совпадает с выводом `CommentSerializer`'
+        )
+        assert admin_client.get(f'{url}{comments[0]["id"]}/').json() == expected[0]
+
+
+class Test08SparseFields:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_fields_parameter(self, admin_client, admin):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        with CaptureQueriesContext(connection) as captured:
+            response = admin_client.get('/api/v1/titles/', {'fields': 'id,name,rating'})
+        assert response.status_code == 200
+        assert [list(title) for title in response.json()['results']] == [['id', 'name', 'rating']] * 2, (
+            'Проверьте, что параметр `fields` ограничивает поля произведений'
+        )
+        assert len(captured) == 3, (
+            'Проверьте, что без поля `genre` жанры не загружаются'
+        )
+        page_sql = captured[-1]['sql']
+        assert 'description' not in page_sql and 'reviews_category' not in page_sql, (
+            'Проверьте, что параметр `fields` ограничивает столбцы и соединения в запросе'
+        )
+
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        with CaptureQueriesContext(connection) as captured:
+            data = admin_client.get(url, {'fields': 'id,score', 'pagination': 'cursor'}).json()
+        assert data['results'] == [{'id': review['id'], 'score': review['score']} for review in reviews[:3]]
+        assert 'reviews_user' not in captured[-1]['sql']
+
+        detail = admin_client.get(f'{url}{reviews[0]["id"]}/comments/{comments[0]["id"]}/', {'fields': 'text'})
+        assert detail.json() == {'text': comments[0]['text']}
+
+        response = admin_client.get('/api/v1/titles/', {'fields': 'id,secret'})
+        assert response.status_code == 400, (
+            'Проверьте, что неизвестное поле в параметре `fields` возвращает статус 400'
+        )
+
+
+class Test08NestedLookup:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_parent_resolved_once(self, admin_client, user_client):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        with CaptureQueriesContext(connection) as captured:
+            response = user_client.post(url, data={'text': 'Отзыв', 'score': 7})
+        assert response.status_code == 201
+        title_lookups = [
+            query for query in captured
+            if query['sql'].startswith('SELECT') and 'FROM "reviews_title"' in query['sql']
+        ]
+        assert len(title_lookups) == 1, (
+            'Проверьте, что при создании отзыва произведение загружается один раз'
+        )
+        review_id = response.json()['id']
+
+        comments_url = f'{url}{review_id}/comments/'
+        comment_id = admin_client.post(comments_url, data={'text': 'Ответ'}).json()['id']
+        with CaptureQueriesContext(connection) as captured:
+            response = admin_client.get(f'{comments_url}{comment_id}/')
+        assert response.status_code == 200 and len(captured) == 2, (
+            'Проверьте, что комментарий и его вложенность проверяются одним запросом, не считая версий для ETag'
+        )
+        wrong_url = f'/api/v1/titles/{titles[1]["id"]}/reviews/{review_id}/comments/{comment_id}/'
+        assert admin_client.get(wrong_url).status_code == 404
+        assert admin_client.get(f'/api/v1/titles/{titles[1]["id"]}/reviews/{review_id}/comments/').status_code == 404
+
+
+class Test08RelatedDisplay:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_list_page_in_one_query(self, admin_client, admin):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/'
+        admin_client.get(url)
+        with CaptureQueriesContext(connection) as captured:
+            data = admin_client.get(url, {'pagination': 'cursor'}).json()
+        assert len(captured) == 2, (
+            'Проверьте, что страница комментариев с курсорной пагинацией загружается одним запросом, не считая версий для ETag'
+        )
+        assert data['results'][0]['review'] == reviews[0]['text']
+        assert data['results'][0]['author'] == comments[0]['author']
+
+        with CaptureQueriesContext(connection) as captured:
+            data = admin_client.get(url, {'related': 'id'}).json()
+        assert len(captured) == 3
+        assert '"reviews_review"."text"' not in captured[-1]['sql'], (
+            'Проверьте, что с `related=id` текст отзыва не загружается'
+        )
+        assert data['results'][0]['review'] == reviews[0]['id'], (
+            'Проверьте, что параметр `related=id` заменяет отзыв его id'
+        )
+
+        data = admin_client.get(f'/api/v1/titles/{titles[0]["id"]}/reviews/', {'related': 'id'}).json()
+        assert data['results'][0]['title'] == titles[0]['id']
+        assert admin_client.get(url, {'related': 'name'}).status_code == 400
+
+
+class Test08PermissionQueries:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_object_permission_without_queries(self, admin_client, admin, user_client,
+                                                  django_assert_num_queries):
+        from django.contrib.auth.models import AnonymousUser
+        from rest_framework.test import APIRequestFactory
+
+        from api.authentication import TokenUserAuthentication, get_access_token
+        from api.permissions import IsAdminModerator
+        from reviews.models import Review
+
+        _, titles, user, moderator = create_reviews(admin_client, admin)
+        review = Review.objects.only('id', 'author_id').get(author=admin)
+        authentication = TokenUserAuthentication()
+        token_users = [
+            (authentication.get_user(authentication.get_validated_token(str(get_access_token(account)))), allowed)
+            for account, allowed in ((admin, True), (user, False), (moderator, True))
+        ]
+        request = APIRequestFactory().patch('/')
+        permission = IsAdminModerator()
+        with django_assert_num_queries(0):
+            for token_user, allowed in token_users:
+                request.user = token_user
+                assert permission.has_object_permission(request, None, review) is allowed, (
+                    'Проверьте, что права на объект проверяются по `author_id` и роли из токена без запросов к БД'
+                )
+            request.user = AnonymousUser()
+            assert not permission.has_object_permission(request, None, review)
+
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{review.id}/'
+        user_client.get(url)
+        with django_assert_num_queries(1):
+            assert user_client.patch(url, data={'text': 'Чужой'}).status_code == 403, (
+                'Проверьте, что при отказе в правах выполняется только запрос самого отзыва'
+            )
+
+
+class Test08UserUniqueness:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_signup_round_trips(self, client, settings):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from reviews.models import User
+
+        settings.EMAIL_OUTBOX_EAGER = False
+        data = {'username': 'newbie', 'email': 'newbie@yamdb.fake'}
+        with CaptureQueriesContext(connection) as captured:
+            assert client.post('/api/v1/auth/signup/', data=data).status_code == 200
+        user_queries = [query['sql'] for query in captured if '"reviews_user"' in query['sql']]
+        assert len(user_queries) == 2 and user_queries[1].startswith('INSERT'), (
+            'Проверьте, что регистрация проверяет уникальность одним запросом '
+            'и создаёт пользователя с кодом подтверждения одной записью'
+        )
+        user = User.objects.get(username='newbie')
+        assert len(user.confirmation_code) == 32
+        assert client.post('/api/v1/auth/token/', data={
+            'username': 'newbie', 'confirmation_code': user.confirmation_code
+        }).status_code == 200
+
+        response = client.post('/api/v1/auth/signup/', data={'username': 'newbie', 'email': 'newbie@yamdb.fake'})
+        assert response.status_code == 400 and set(response.json()) == {'username', 'email'}, (
+            'Проверьте, что занятые username и email возвращают ошибки для обоих полей'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_integrity_error_is_400(self, admin_client, admin, monkeypatch):
+        from api.serializers import UniqueUserMixin
+
+        monkeypatch.setattr(UniqueUserMixin, 'validate', lambda self, data: data)
+        response = admin_client.post('/api/v1/users/', data={'username': 'copy', 'email': admin.email})
+        assert response.status_code == 400, (
+            'Проверьте, что нарушение уникальности при записи возвращает статус 400'
+        )
+        response = admin_client.post('/api/v1/auth/signup/', data={'username': admin.username, 'email': 'x@yamdb.fake'})
+        assert response.status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_patch_keeps_own_values(self, user_client, user):
+        response = user_client.patch('/api/v1/users/me/', data={'username': user.username, 'bio': 'Обо мне'})
+        assert response.status_code == 200, (
+            'Проверьте, что пользователь может отправить свои текущие username и email'
+        )
+
+
+class Test08UserBulk:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_bulk_create_and_update(self, admin_client, user, django_assert_max_num_queries):
+        from reviews.models import User
+
+        rows = [
+            {'username': f'hr{i}', 'email': f'hr{i}@yamdb.fake', 'role': 'moderator'}
+            for i in range(30)
+        ]
+        rows += [
+            {'username': user.username, 'email': user.email, 'bio': 'Из выгрузки'},
+            {'username': 'hr0', 'email': 'other@yamdb.fake'},
+            {'username': 'stranger', 'email': user.email},
+            {'username': 'me', 'email': 'me@yamdb.fake'},
+            'не объект',
+        ]
+        with django_assert_max_num_queries(10):
+            response = admin_client.post('/api/v1/users/bulk/', data=rows, format='json')
+        assert response.status_code == 200, (
+            'Проверьте, что POST /api/v1/users/bulk/ администратора возвращает статус 200'
+        )
+        data = response.json()
+        assert (data['created'], data['updated'], data['failed']) == (30, 1, 4), (
+            'Проверьте, что ответ считает созданных, обновлённых и отклонённых пользователей'
+        )
+        statuses = [(result['index'], result['status']) for result in data['results']]
+        assert statuses == [(i, 'created') for i in range(30)] + [
+            (30, 'updated'), (31, 'failed'), (32, 'failed'), (33, 'failed'), (34, 'failed')
+        ], 'Проверьте, что результаты идут в порядке строк запроса'
+        assert set(data['results'][31]['errors']) == {'username'}
+        assert set(data['results'][32]['errors']) == {'email'}
+
+        assert User.objects.filter(username__startswith='hr', role='moderator').count() == 30
+        user.refresh_from_db()
+        assert user.bio == 'Из выгрузки' and user.role == 'user', (
+            'Проверьте, что обновляются только поля, переданные в строке'
+        )
+
+        codes = set(User.objects.filter(
+            username__startswith='hr').values_list('confirmation_code', flat=True))
+        assert len(codes) == 30 and all(len(code) == 32 for code in codes), (
+            'Проверьте, что каждому созданному пользователю выдаётся свой случайный код'
+        )
+        response = admin_client.post('/api/v1/auth/token/', data={
+            'username': 'hr0', 'confirmation_code': '000000'})
+        assert response.status_code == 400, (
+            'Проверьте, что код по умолчанию не подходит для получения токена'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_ndjson_and_access(self, admin_client, user_client):
+        from reviews.models import User
+
+        body = '{"username": "line1", "email": "line1@yamdb.fake"}\n\n{"username": "line2", "email": "line2@yamdb.fake"}\n'
+        response = admin_client.post('/api/v1/users/bulk/', data=body, content_type='application/x-ndjson')
+        assert response.status_code == 200 and response.json()['created'] == 2, (
+            'Проверьте, что /api/v1/users/bulk/ принимает NDJSON'
+        )
+        assert User.objects.filter(username__in=['line1', 'line2']).count() == 2
+
+        response = admin_client.post('/api/v1/users/bulk/', data='{"username": "x"}\n{', content_type='application/x-ndjson')
+        assert response.status_code == 400 and 'line 2' in response.json()['detail']
+        response = admin_client.post('/api/v1/users/bulk/', data={'username': 'x'}, format='json')
+        assert response.status_code == 400, 'Проверьте, что тело должно быть списком пользователей'
+
+        response = user_client.post('/api/v1/users/bulk/', data=[], format='json')
+        assert response.status_code == 403, (
+            'Проверьте, что массовая загрузка пользователей доступна только администратору'
+        )